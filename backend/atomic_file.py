@@ -0,0 +1,29 @@
+"""
+Atomic replacement of cache and output files.
+
+The new content is written to a temporary file next to the target and then
+renamed over it, so a reader (or another process writing the same file)
+sees either the old file or the complete new one, never a partial write.
+"""
+import os
+from pathlib import Path
+
+
+def atomic_write(path, write_fn, mode: str = "wb", encoding: str = None):
+    """
+    Calls ``write_fn(f)`` with a temporary file opened in ``mode`` next to
+    ``path``, then renames it to ``path``. The temporary file is removed if
+    writing fails, and the error is raised.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, mode, encoding=encoding) as f:
+            write_fn(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
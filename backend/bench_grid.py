@@ -0,0 +1,34 @@
+"""
+Benchmark for the grid builder in map_generator.
+
+Usage (from backend/):
+    python bench_grid.py
+"""
+import random
+import time
+
+import geopandas as gpd
+
+from map_generator import _build_grid, _lattice_edges, _make_mine_zone
+
+UA_JSON = "ua.json"
+RESOLUTIONS = (0.01, 0.005, 0.0025)
+
+
+def main():
+    ukraine = gpd.read_file(UA_JSON).to_crs("EPSG:4326")
+    random.seed(0)
+    mine_zone = _make_mine_zone()
+    minx, miny, maxx, maxy = mine_zone.bounds
+
+    print(f"{'resolution':>10} {'cells':>10} {'kept':>10} {'seconds':>8} {'cells/s':>12}")
+    for resolution in RESOLUTIONS:
+        n_cells = len(_lattice_edges(minx, maxx, resolution)) * len(_lattice_edges(miny, maxy, resolution))
+        t0 = time.perf_counter()
+        grid = _build_grid(mine_zone, ukraine, resolution)
+        elapsed = time.perf_counter() - t0
+        print(f"{resolution:>10} {n_cells:>10,} {len(grid):>10,} {elapsed:>8.2f} {n_cells / elapsed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
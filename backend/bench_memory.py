@@ -0,0 +1,79 @@
+"""
+Resident memory held by the risk grid: the per-cell GeoDataFrame returned by
+``_build_gdf`` (what the server kept before) against the compact RiskGrid.
+
+Each representation is loaded in a fresh interpreter after its imports, and
+the growth in RSS is reported.
+
+Usage (from backend/):
+    python bench_memory.py [--resolutions 0.01 0.0025] [--seed 42]
+"""
+import argparse
+import gc
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def _measure(kind: str, path: str):
+    """Child process: prints ``rss_delta_mb load_seconds``."""
+    import geopandas as gpd
+    from risk_grid import RiskGrid
+
+    gc.collect()
+    before = _rss_mb()
+    t0 = time.perf_counter()
+    obj = gpd.read_parquet(path) if kind == "gdf" else RiskGrid.load(path)
+    elapsed = time.perf_counter() - t0
+    gc.collect()
+    print(f"{_rss_mb() - before:.1f} {elapsed:.4f} {len(obj)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--resolutions", type=float, nargs="+", default=[0.01, 0.0025])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--measure", nargs=2, metavar=("KIND", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        _measure(*args.measure)
+        return
+
+    from map_generator import _build_gdf
+    from risk_grid import RiskGrid
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    print(f"{'resolution':>10} {'cells':>9} {'GeoDataFrame MB':>16} {'RiskGrid MB':>12} {'ratio':>7} {'load gdf s':>11} {'load grid s':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for resolution in args.resolutions:
+            gdf = _build_gdf(os.path.join(here, "ua.json"), resolution, seed=args.seed)
+            gdf_path = os.path.join(tmp, f"gdf-{resolution}.parquet")
+            grid_path = os.path.join(tmp, f"grid-{resolution}.npz")
+            gdf.to_parquet(gdf_path)
+            RiskGrid.from_gdf(gdf, resolution).save(grid_path)
+            del gdf
+
+            results = {}
+            for kind, path in (("gdf", gdf_path), ("grid", grid_path)):
+                out = subprocess.run(
+                    [sys.executable, __file__, "--measure", kind, path],
+                    cwd=here, capture_output=True, text=True, check=True,
+                ).stdout.split()
+                results[kind] = (float(out[0]), float(out[1]), int(out[2]))
+
+            gdf_mb, gdf_s, cells = results["gdf"]
+            grid_mb, grid_s, _ = results["grid"]
+            print(f"{resolution:>10} {cells:>9,} {gdf_mb:>16.1f} {grid_mb:>12.1f} {gdf_mb / max(grid_mb, 0.1):>6.0f}x {gdf_s:>11.3f} {grid_s:>12.4f}")
+
+
+if __name__ == "__main__":
+    main()
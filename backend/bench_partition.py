@@ -0,0 +1,99 @@
+"""
+Benchmark of the partner flood fill: rtree + ``touches`` neighbour discovery
+versus the lattice CSR engine in partition.py.
+
+Usage (from backend/):
+    python bench_partition.py [--skip-legacy]
+"""
+import argparse
+import random
+import time
+from collections import deque
+
+import geopandas as gpd
+import numpy as np
+from rtree import index as rtree_index
+
+from map_generator import _build_grid, _make_mine_zone
+from partition import flood_fill, lattice_adjacency
+
+UA_JSON = "ua.json"
+RESOLUTIONS = (0.01, 0.005)
+SHARES = {'A': 0.5, 'B': 0.35, 'C': 0.15}
+
+
+def legacy_fill(gdf, seeds, targets):
+    """Flood fill as it was done before partition.py existed."""
+    idx = rtree_index.Index()
+    for i, geom in enumerate(gdf.geometry):
+        idx.insert(i, geom.bounds)
+
+    assigned = {}
+    frontiers = {}
+    allocated = {}
+    for p, sid in seeds.items():
+        assigned[sid] = p
+        frontiers[p] = deque([sid])
+        allocated[p] = gdf.loc[sid, 'risk']
+
+    def neighbors(cell_id):
+        geom = gdf.loc[cell_id].geometry
+        for nbr in sorted(idx.intersection(geom.bounds)):
+            if nbr not in assigned and geom.touches(gdf.loc[nbr].geometry):
+                yield nbr
+
+    active = list(seeds)
+    while active:
+        for p in list(active):
+            if not frontiers[p]:
+                active.remove(p)
+                continue
+            current = frontiers[p].popleft()
+            for nbr in neighbors(current):
+                if nbr in assigned: continue
+                assigned[nbr] = p
+                allocated[p] += gdf.loc[nbr, 'risk']
+                frontiers[p].append(nbr)
+                if allocated[p] >= targets[p]:
+                    active.remove(p)
+                    break
+    return assigned
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--skip-legacy", action="store_true", help="only time the lattice engine")
+    args = parser.parse_args()
+
+    ukraine = gpd.read_file(UA_JSON).to_crs("EPSG:4326")
+    random.seed(0)
+    mine_zone = _make_mine_zone()
+
+    print(f"{'resolution':>10} {'cells':>9} {'legacy s':>9} {'lattice s':>10} {'speedup':>8}")
+    for resolution in RESOLUTIONS:
+        gdf = _build_grid(mine_zone, ukraine, resolution)
+        y = gdf.geometry.bounds['miny'].to_numpy()
+        x = gdf.geometry.bounds['minx'].to_numpy()
+        seeds = {'A': int(np.argmin(y)), 'B': int(np.argmax(y)), 'C': int(np.argmin(x))}
+        total_risk = gdf['risk'].sum()
+        targets = {p: total_risk * share for p, share in SHARES.items()}
+
+        t0 = time.perf_counter()
+        indptr, indices = lattice_adjacency(gdf['i'], gdf['j'], gdf.geometry.values, resolution)
+        owner = flood_fill(indptr, indices, seeds, targets, weights=gdf['risk'].to_numpy())
+        lattice = time.perf_counter() - t0
+
+        legacy = float("nan")
+        if not args.skip_legacy:
+            t0 = time.perf_counter()
+            assigned = legacy_fill(gdf, seeds, targets)
+            legacy = time.perf_counter() - t0
+            codes = {p: k for k, p in enumerate(seeds)}
+            expected = np.array([codes[assigned[r]] if r in assigned else -1 for r in range(len(gdf))])
+            assert (expected == owner).all(), "lattice fill disagrees with legacy fill"
+
+        print(f"{resolution:>10} {len(gdf):>9,} {legacy:>9.2f} {lattice:>10.3f} {legacy / lattice:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+PDF report time and peak memory for synthetic operator data covering 1, 12
+and 120 months.
+
+Each size is rendered in a fresh interpreter, with charts drawn in the
+worker process pool ("parallel") and in-process ("serial"). The first
+(cold) render pays for imports, font caches and starting the pool; the
+reported time, per-stage timings and peak RSS growth of the server process
+come from a second render.
+
+Usage (from backend/):
+    python bench_report.py [--months 1 12 120] [--operators 8] [--sectors 6]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def write_spreadsheets(directory: str, months: int, operators: int, sectors: int, seed: int = 0):
+    """Writes operator and team-lead spreadsheets shaped like the examples in assets/."""
+    rng = np.random.default_rng(seed)
+    month_starts = pd.date_range("2016-01-01", periods=months, freq="MS")
+    ops = [f"Op{k + 1}" for k in range(operators)]
+    secs = [chr(ord("A") + k) for k in range(sectors)]
+
+    n = months * operators
+    operator = pd.DataFrame({
+        "Month": np.repeat(month_starts, operators),
+        "Sector": rng.choice(secs, n),
+        "Operator": np.tile(ops, months),
+        "MinesFound": rng.integers(0, 25, n),
+    })
+    teamlead = pd.DataFrame({
+        "Month": np.repeat(month_starts, operators),
+        "Operator": np.tile(ops, months),
+        "SectorAllotted": rng.choice(secs, n),
+    })
+    op_path = os.path.join(directory, f"operator_{months}.xlsx")
+    tl_path = os.path.join(directory, f"teamlead_{months}.xlsx")
+    operator.to_excel(op_path, index=False)
+    teamlead.to_excel(tl_path, index=False)
+    return op_path, tl_path
+
+
+def _measure(mode: str, op_path: str, tl_path: str):
+    """Child process: prints a JSON line with seconds, peak MB and stage timings."""
+    from pdf_report_generator import build_report
+
+    parallel = mode == "parallel"
+    t0 = time.perf_counter()
+    build_report(op_path, tl_path, parallel=parallel)
+    cold = time.perf_counter() - t0
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = {}
+    t0 = time.perf_counter()
+    body = build_report(op_path, tl_path, timings=timings, parallel=parallel)
+    seconds = time.perf_counter() - t0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({
+        "seconds": seconds,
+        "cold_seconds": cold,
+        "peak_mb": (peak - baseline) / 1024,
+        "bytes": len(body),
+        "timings": timings,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months", type=int, nargs="+", default=[1, 12, 120])
+    parser.add_argument("--operators", type=int, default=8)
+    parser.add_argument("--sectors", type=int, default=6)
+    parser.add_argument("--measure", nargs=3, metavar=("MODE", "OP", "TL"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        _measure(*args.measure)
+        return
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as tmp:
+        for months in args.months:
+            op_path, tl_path = write_spreadsheets(tmp, months, args.operators, args.sectors)
+            for mode in ("parallel", "serial"):
+                out = subprocess.run(
+                    [sys.executable, __file__, "--measure", mode, op_path, tl_path],
+                    cwd=here, capture_output=True, text=True, check=True,
+                ).stdout.strip().splitlines()[-1]
+                result = json.loads(out)
+                stages = "  ".join(f"{k}={v * 1000:.0f}ms" for k, v in result["timings"].items())
+                print(f"{months:>4} months  {mode:<8}  {result['seconds']:6.2f} s (cold {result['cold_seconds']:5.2f} s)  "
+                      f"peak +{result['peak_mb']:5.1f} MB  {result['bytes'] / 1024:5.0f} KiB  {stages}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Bytes-on-the-wire per risk-map endpoint for each content coding, plus the
+size of a revalidation that ends in 304 Not Modified.
+
+Usage (from backend/):
+    python bench_wire.py
+"""
+from fastapi.testclient import TestClient
+
+import server
+from response_cache import ENCODINGS
+
+ENDPOINTS = (
+    "/risk-map/geojson",
+    "/risk-map/geojson?partner=A",
+    "/risk-map/geojson/all-risk",
+    "/risk-map/geojson/leaders",
+    "/risk-map/geojson/all-risk?format=topojson",
+    "/risk-map/geojson/leaders?format=topojson",
+    "/risk-map/outlines",
+    "/risk-map/outlines?format=topojson",
+)
+
+
+def main():
+    client = TestClient(server.app)
+    codings = ("identity",) + ENCODINGS
+
+    print(f"{'endpoint':<44}" + "".join(f"{c:>12}" for c in codings) + f"{'304':>8}")
+    for url in ENDPOINTS:
+        sizes = []
+        etag = None
+        for coding in codings:
+            r = client.get(url, headers={"Accept-Encoding": coding})
+            r.raise_for_status()
+            sizes.append(r.num_bytes_downloaded)
+            if coding == "identity":
+                etag = r.headers["etag"]
+        r = client.get(url, headers={"Accept-Encoding": "identity", "If-None-Match": etag})
+        assert r.status_code == 304, r.status_code
+        print(f"{url:<44}" + "".join(f"{s:>12,}" for s in sizes) + f"{r.num_bytes_downloaded:>8,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Distance from any point to the nearest dangerous cell.
+
+For each risk threshold a DangerField keeps, for every lattice square, the
+row of the nearest cell whose risk is above the threshold. The table comes
+from ``scipy.ndimage.distance_transform_edt`` over the lattice, with the
+lattice spacing converted to metres at its middle latitude.
+
+The table holds the cell nearest to the centre of each square, which need
+not be the one nearest to a point elsewhere in the square. A query measures
+the point's distance D to its square's entry, then checks every dangerous
+cell whose lattice square comes within D of the point: no other cell can be
+nearer. Distances are measured to the cells' own polygons, clipped border
+cells included: on a local plane around the point (WGS84 radii of curvature
+at its latitude) to find each cell's nearest point and the candidates, then
+along the WGS84 geodesic to those points to pick the nearest cell and give
+its distance and bearing.
+"""
+import hashlib
+import math
+from pathlib import Path
+
+import numpy as np
+import shapely
+from pyproj import Geod
+from scipy.ndimage import distance_transform_edt
+
+from atomic_file import atomic_write
+from risk_grid import RiskGrid
+
+DEFAULT_THRESHOLDS = (0.2, 0.4, 0.6, 0.8)
+
+_GEOD = Geod(ellps="WGS84")
+
+# Distances on the local plane around a point stay within 0.7% of the WGS84
+# geodesic across the lattice; candidates are gathered this much farther out
+_PLANE_MARGIN = 1.01
+
+# WGS84 semi-major axis (m) and first eccentricity squared
+_WGS84_A = 6378137.0
+_WGS84_E2 = 6.69437999014e-3
+
+
+def _metres_per_degree(lat: float):
+    """Metres per degree east and north at latitude ``lat``, from the WGS84 radii of curvature."""
+    phi = math.radians(lat)
+    w = 1 - _WGS84_E2 * math.sin(phi) ** 2
+    to_m = math.pi / 180
+    return _WGS84_A / math.sqrt(w) * math.cos(phi) * to_m, _WGS84_A * (1 - _WGS84_E2) / w ** 1.5 * to_m
+
+
+def _cache_prefix(version) -> str:
+    return f"danger-{str(version)[:32]}-"
+
+
+def prune_cached(cache_dir, version):
+    """Deletes the tables cached under ``cache_dir`` for versions other than ``version``."""
+    keep = _cache_prefix(version)
+    for path in Path(cache_dir).glob("danger-*.npy"):
+        if not path.name.startswith(keep):
+            try:
+                path.unlink()
+            except OSError as e:
+                print(f"⚠️  Could not remove stale danger field {path}: {e}")
+
+
+def _row_lattice(grid: RiskGrid) -> np.ndarray:
+    """(columns, rows) int32 lattice of cell rows, -1 for squares without a cell."""
+    row_of = np.full((len(grid.x_lines) - 1, len(grid.y_lines) - 1), -1, dtype=np.int32)
+    row_of[grid.i, grid.j] = np.arange(len(grid), dtype=np.int32)
+    return row_of
+
+
+def nearest_danger(grid: RiskGrid, thresholds) -> np.ndarray:
+    """
+    (thresholds, columns, rows) int32 table: the row of the cell nearest to
+    each lattice square among cells with risk above each threshold, or -1
+    when no cell is above it.
+    """
+    row_of = _row_lattice(grid)
+    risk = np.full(row_of.shape, -np.inf)
+    risk[grid.i, grid.j] = grid.risk
+
+    kx, ky = _metres_per_degree((grid.y_lines[0] + grid.y_lines[-1]) / 2)
+    sampling = (grid.resolution * kx, grid.resolution * ky)
+    nearest = np.full((len(thresholds),) + row_of.shape, -1, dtype=np.int32)
+    for k, threshold in enumerate(thresholds):
+        danger = risk > threshold
+        if danger.any():
+            ii, jj = distance_transform_edt(~danger, sampling=sampling, return_distances=False, return_indices=True)
+            nearest[k] = row_of[ii, jj]
+    return nearest
+
+
+class DangerField:
+    """
+    Nearest-danger lookups for one dataset version. With ``cache_dir`` the
+    table is written there once per version and thresholds and then
+    memory-mapped, so processes serving the same version share one copy.
+    """
+
+    def __init__(self, grid: RiskGrid, version, thresholds=DEFAULT_THRESHOLDS, cache_dir=None):
+        self.grid = grid
+        self.version = version
+        self.thresholds = tuple(sorted({float(t) for t in thresholds}))
+        self.nearest = nearest_danger(grid, self.thresholds) if cache_dir is None else self._mapped(Path(cache_dir))
+        self._row_of = _row_lattice(grid)
+        # Position of each row among the clipped border cells, or -1
+        self._clipped_pos = np.full(len(grid), -1, dtype=np.int64)
+        self._clipped_pos[grid.clipped_rows] = np.arange(len(grid.clipped_rows))
+
+    def _mapped(self, cache_dir: Path) -> np.ndarray:
+        digest = hashlib.sha256(repr(self.thresholds).encode("utf-8")).hexdigest()[:12]
+        path = cache_dir / f"{_cache_prefix(self.version)}{digest}.npy"
+        if not path.exists():
+            nearest = nearest_danger(self.grid, self.thresholds)
+            try:
+                cache_dir.mkdir(parents=True, exist_ok=True)
+                atomic_write(path, lambda f: np.save(f, nearest))
+            except OSError as e:
+                print(f"⚠️  Could not write danger field {path}: {e}")
+                return nearest
+        return np.load(path, mmap_mode="r")
+
+    def threshold_index(self, threshold: float) -> int:
+        """Position of ``threshold`` among ``thresholds``, or -1."""
+        for k, t in enumerate(self.thresholds):
+            if math.isclose(t, threshold, abs_tol=1e-9):
+                return k
+        return -1
+
+    def lookup(self, lon: float, lat: float, threshold_index: int):
+        """
+        Distance in metres and bearing in degrees (clockwise from north)
+        from the point to the nearest cell above the threshold, with that
+        cell's centroid and risk. Distance 0 (and no bearing) means the
+        point is inside that cell; distance None means no cell is above the
+        threshold. Returns None when the point is in no cell.
+        """
+        grid = self.grid
+        here = grid.locate_point(lon, lat)
+        if here < 0:
+            return None
+        threshold = self.thresholds[threshold_index]
+        entry = {"threshold": threshold, "distance_m": None, "bearing_deg": None, "nearest": None}
+        kx, ky = _metres_per_degree(lat)
+
+        if grid.risk[here] > threshold:
+            row, distance, bearing = here, 0.0, None
+        else:
+            i, j = grid.lattice_square(lon, lat)
+            seed = int(self.nearest[threshold_index, i, j])
+            if seed < 0:
+                return entry
+            # Every cell that could be nearer on the geodesic than the seed cell, with its nearest point
+            reach = self._distance(seed, lon, lat, kx, ky)[0] * _PLANE_MARGIN
+            rows, points = [], []
+            for r in self._candidates(reach, lon, lat, kx, ky, threshold):
+                distance, east, north = self._distance(r, lon, lat, kx, ky)
+                if distance <= reach:
+                    rows.append(r)
+                    points.append((lon + east / kx, lat + north / ky))
+            points = np.array(points)
+            n = len(rows)
+            azimuth, _, geodesic = _GEOD.inv(np.full(n, lon), np.full(n, lat), points[:, 0], points[:, 1])
+            k = min(range(n), key=lambda m: (geodesic[m], rows[m]))
+            row, distance = rows[k], float(geodesic[k])
+            bearing = round(float(azimuth[k]) % 360, 1) if distance > 0 else None
+
+        cx, cy = grid.centroids([row])[0]
+        entry.update(
+            distance_m=round(distance, 1),
+            bearing_deg=bearing,
+            nearest={"lon": float(cx), "lat": float(cy), "risk": float(grid.risk[row])},
+        )
+        return entry
+
+    def _candidates(self, radius: float, lon: float, lat: float, kx: float, ky: float, threshold: float):
+        """Rows of the cells above ``threshold`` whose lattice square comes within ``radius`` metres."""
+        grid = self.grid
+        xs, ys = grid.x_lines, grid.y_lines
+        # A micrometre of slack, so rounding never drops the cell the radius was measured to
+        radius += 1e-6
+        i0, i1 = np.searchsorted(xs, (lon - radius / kx, lon + radius / kx), side="right") - 1
+        j0, j1 = np.searchsorted(ys, (lat - radius / ky, lat + radius / ky), side="right") - 1
+        window = self._row_of[max(i0, 0):max(i1, 0) + 1, max(j0, 0):max(j1, 0) + 1].ravel()
+        rows = window[window >= 0]
+        rows = rows[grid.risk[rows] > threshold]
+        # A cell lies inside its square, so the square's distance is a lower bound for the cell's
+        gi, gj = grid.i[rows], grid.j[rows]
+        east = (np.minimum(np.maximum(lon, xs[gi]), xs[gi + 1]) - lon) * kx
+        north = (np.minimum(np.maximum(lat, ys[gj]), ys[gj + 1]) - lat) * ky
+        return rows[np.hypot(east, north) <= radius].tolist()
+
+    def _distance(self, row: int, lon: float, lat: float, kx: float, ky: float):
+        """
+        Distance in metres from the point to the cell of ``row``, and the
+        (east, north) offset of the cell's nearest point. An unclipped cell
+        fills its lattice square; only a border cell needs its polygon.
+        """
+        grid = self.grid
+        pos = self._clipped_pos[row]
+        if pos < 0:
+            i, j = grid.i[row], grid.j[row]
+            east = (min(max(lon, grid.x_lines[i]), grid.x_lines[i + 1]) - lon) * kx
+            north = (min(max(lat, grid.y_lines[j]), grid.y_lines[j + 1]) - lat) * ky
+            return math.hypot(east, north), east, north
+        local = shapely.transform(grid.clipped_geoms[pos], lambda xy: (xy - (lon, lat)) * (kx, ky))
+        origin = shapely.Point(0, 0)
+        east, north = shapely.get_coordinates(shapely.shortest_line(origin, local))[1]
+        return float(shapely.distance(origin, local)), float(east), float(north)
@@ -0,0 +1,199 @@
+"""
+Versioned risk-grid datasets and their background rebuilds.
+
+A Dataset bundles one RiskGrid with everything derived from it (viewport
+index, vector tiles, dissolved outlines, nearest-danger tables, rendered
+responses), so replacing the served dataset is a single reference swap. A
+DatasetManager builds new versions in a worker process while the previous
+version keeps serving.
+"""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from danger import DEFAULT_THRESHOLDS, DangerField, prune_cached
+from grid_cache import load_or_build_grid
+from grid_query import GridIndex
+from outlines import dissolve
+from response_cache import ResponseCache
+from tiles import TileSet
+
+
+class Dataset:
+    """
+    One dataset version and its lazily created derived caches.
+    ``danger_thresholds`` and ``danger_cache_dir`` configure its DangerField.
+    """
+
+    def __init__(self, grid, info, danger_thresholds=DEFAULT_THRESHOLDS, danger_cache_dir=None):
+        self.grid = grid
+        self.info = info
+        self.version = info["key"]
+        self.danger_thresholds = danger_thresholds
+        self.danger_cache_dir = danger_cache_dir
+        # Serialized payloads, rendered once for this version
+        self.responses = ResponseCache()
+        self._grid_index = None
+        self._tile_set = None
+        self._outlines = {}
+        self._danger_field = None
+        self._lock = threading.Lock()
+
+    def grid_index(self) -> GridIndex:
+        if self._grid_index is None:
+            with self._lock:
+                if self._grid_index is None:
+                    self._grid_index = GridIndex(self.grid)
+        return self._grid_index
+
+    def tile_set(self) -> TileSet:
+        if self._tile_set is None:
+            with self._lock:
+                if self._tile_set is None:
+                    self._tile_set = TileSet(self.grid, self.version)
+        return self._tile_set
+
+    def outlines(self, level: str):
+        """GeoDataFrame of dissolved leader or partner zones, computed once per level."""
+        if level not in self._outlines:
+            with self._lock:
+                if level not in self._outlines:
+                    self._outlines[level] = dissolve(self.grid, level)
+        return self._outlines[level]
+
+    def danger_field(self) -> DangerField:
+        if self._danger_field is None:
+            with self._lock:
+                if self._danger_field is None:
+                    self._danger_field = DangerField(self.grid, self.version, self.danger_thresholds,
+                                                     self.danger_cache_dir)
+        return self._danger_field
+
+
+def _build(ua_geojson_path: str, seed: int):
+    """Worker process entry point; returns ``(grid, info)``."""
+    return load_or_build_grid(ua_geojson_path, seed=seed)
+
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class DatasetManager:
+    """
+    Holds the current Dataset and rebuilds it in a single worker process.
+
+    Request handlers should read ``current`` once and use that snapshot;
+    a rebuild replaces it only after the new grid is complete. ``on_swap``
+    is called with each newly installed Dataset. The danger settings are
+    passed to every Dataset; with ``danger_cache_dir``, tables cached there
+    for other versions are deleted when a version is installed.
+    """
+
+    def __init__(self, ua_geojson_path: str, seed: int, on_swap=None,
+                 danger_thresholds=DEFAULT_THRESHOLDS, danger_cache_dir=None):
+        self.ua_geojson_path = ua_geojson_path
+        self.seed = seed
+        self.on_swap = on_swap
+        self.danger_thresholds = danger_thresholds
+        self.danger_cache_dir = danger_cache_dir
+        self.current = None
+        self.state = "idle"  # idle | building | failed
+        self.last_error = None
+        self.last_build_seconds = None
+        self.last_built_at = None
+        self._lock = threading.Lock()
+        self._executor = None
+        self._future = None
+        self._stop = threading.Event()
+
+    def load_cached(self) -> bool:
+        """Installs the cached grid for the current inputs, if there is one."""
+        grid, info = load_or_build_grid(self.ua_geojson_path, seed=self.seed, build=False)
+        if grid is None:
+            return False
+        self._swap(grid, info, info["load_seconds"])
+        return True
+
+    def rebuild(self):
+        """Starts a rebuild unless one is already running; returns its future."""
+        with self._lock:
+            if self._future is not None and not self._future.done():
+                return self._future
+            if self._executor is None:
+                # spawn: forking a process that runs server threads is unsafe
+                self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+            self.state = "building"
+            started = time.perf_counter()
+            future = self._executor.submit(_build, self.ua_geojson_path, self.seed)
+            self._future = future
+        future.add_done_callback(lambda f: self._finish(f, started))
+        return future
+
+    def watch(self, interval: float):
+        """Polls ``ua.json`` every ``interval`` seconds and rebuilds when it changes."""
+        def run():
+            last = _stat(self.ua_geojson_path)
+            while not self._stop.wait(interval):
+                current = _stat(self.ua_geojson_path)
+                if current != last:
+                    last = current
+                    print(f"📍 {os.path.basename(self.ua_geojson_path)} changed, rebuilding risk grid...")
+                    self.rebuild()
+
+        threading.Thread(target=run, name="ua-json-watcher", daemon=True).start()
+
+    def shutdown(self):
+        self._stop.set()
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+
+    def status(self) -> dict:
+        dataset = self.current
+        return {
+            "ready": dataset is not None,
+            "version": dataset.version if dataset is not None else None,
+            "state": self.state,
+            "last_build_seconds": round(self.last_build_seconds, 3) if self.last_build_seconds is not None else None,
+            "last_built_at": self.last_built_at,
+            "last_error": self.last_error,
+        }
+
+    def _finish(self, future, started):
+        try:
+            grid, info = future.result()
+        except Exception as e:
+            with self._lock:
+                self.state = "failed"
+                self.last_error = str(e)
+                if isinstance(e, BrokenProcessPool):
+                    # The worker died; the next rebuild starts a fresh pool
+                    self._executor = None
+            print(f"❌ Risk grid rebuild failed, still serving the previous version: {e}")
+            return
+        self._swap(grid, info, time.perf_counter() - started)
+
+    def _swap(self, grid, info, seconds: float):
+        with self._lock:
+            previous = self.current
+            # An unchanged version keeps the existing dataset and its warm caches
+            swapped = previous is None or previous.version != info["key"]
+            if swapped:
+                self.current = Dataset(grid, info, self.danger_thresholds, self.danger_cache_dir)
+            self.state = "idle"
+            self.last_error = None
+            self.last_build_seconds = seconds
+            self.last_built_at = time.time()
+            dataset = self.current
+        print(f"✅ Risk grid {dataset.version[:12]} ({len(grid)} cells) ready in {seconds * 1000:.0f} ms")
+        if swapped and self.danger_cache_dir is not None:
+            prune_cached(self.danger_cache_dir, dataset.version)
+        if swapped and self.on_swap is not None:
+            self.on_swap(dataset)
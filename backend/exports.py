@@ -0,0 +1,36 @@
+"""
+Columnar binary exports of the risk grid.
+
+Arrow IPC and GeoParquet load into pandas/geopandas in a fraction of the time
+GeoJSON takes to parse. Geometry is written either as WKB or as native
+GeoArrow coordinate arrays.
+"""
+import io
+
+import pyarrow as pa
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.file"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+# Query parameter value -> geopandas geometry_encoding
+GEOMETRY_ENCODINGS = {"wkb": "WKB", "geoarrow": "geoarrow"}
+
+
+def to_arrow_ipc(gdf, geometry_encoding: str = "wkb") -> bytes:
+    """
+    Serializes ``gdf`` as a zstd-compressed Arrow IPC file. Read it back with
+    ``GeoDataFrame.from_arrow(pyarrow.ipc.open_file(source).read_all())``.
+    """
+    table = pa.table(gdf.to_arrow(index=False, geometry_encoding=GEOMETRY_ENCODINGS[geometry_encoding]))
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression="zstd")
+    with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def to_geoparquet(gdf, geometry_encoding: str = "wkb") -> bytes:
+    """Serializes ``gdf`` as zstd-compressed GeoParquet (``geopandas.read_parquet``)."""
+    buf = io.BytesIO()
+    gdf.to_parquet(buf, index=False, compression="zstd", geometry_encoding=GEOMETRY_ENCODINGS[geometry_encoding])
+    return buf.getvalue()
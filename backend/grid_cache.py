@@ -0,0 +1,90 @@
+"""
+Content-addressed on-disk cache for the partitioned risk grid.
+
+The finished grid is stored as a RiskGrid ``.npz`` under a key derived from
+everything that determines it: the bytes of ``ua.json``, the random seed,
+the grid resolution, the partner shares and the team leader definition. A
+server start with unchanged inputs loads the file instead of rebuilding.
+"""
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+from atomic_file import atomic_write
+from map_generator import PARTNER_SHARES, TEAM_LEADERS, _build_gdf
+from risk_grid import RiskGrid
+
+# Bump when _build_gdf or the RiskGrid layout changes in a way that alters the file
+CACHE_FORMAT = 3
+
+DEFAULT_CACHE_DIR = Path(__file__).parent / ".cache"
+
+
+def cache_key(ua_geojson_path: str, seed: int, resolution: float, partners: dict, team_leaders: dict) -> str:
+    """Hex digest identifying the grid built from these inputs."""
+    with open(ua_geojson_path, "rb") as f:
+        ua_digest = hashlib.sha256(f.read()).hexdigest()
+    # Lists of pairs keep the dict order, which decides flood-fill order
+    payload = {
+        "format": CACHE_FORMAT,
+        "ua": ua_digest,
+        "seed": seed,
+        "resolution": repr(float(resolution)),
+        "partners": [[k, v] for k, v in partners.items()],
+        "team_leaders": [[k, list(v)] for k, v in team_leaders.items()],
+    }
+    blob = json.dumps(payload, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()[:32]
+
+
+def load_or_build_grid(
+    ua_geojson_path: str,
+    seed: int,
+    resolution: float = 0.01,
+    partners: dict = None,
+    team_leaders: dict = None,
+    cache_dir=None,
+    build: bool = True,
+):
+    """
+    Returns ``(grid, info)``. The grid is read from the cache when a file for
+    the current key exists, otherwise it is built and written back. With
+    ``build=False`` a cache miss returns ``(None, info)`` instead.
+
+    ``info`` holds ``key``, ``hit`` (bool), ``path`` and ``load_seconds``,
+    the wall time spent loading or building.
+    """
+    partners = PARTNER_SHARES if partners is None else partners
+    team_leaders = TEAM_LEADERS if team_leaders is None else team_leaders
+    cache_dir = Path(cache_dir or os.environ.get("RISK_MAP_CACHE_DIR", DEFAULT_CACHE_DIR))
+
+    key = cache_key(ua_geojson_path, seed, resolution, partners, team_leaders)
+    path = cache_dir / f"grid-{key}.npz"
+
+    t0 = time.perf_counter()
+    if path.exists():
+        try:
+            grid = RiskGrid.load(path)
+            info = {"key": key, "hit": True, "path": str(path), "load_seconds": time.perf_counter() - t0}
+            return grid, info
+        except Exception as e:
+            print(f"⚠️  Ignoring unreadable grid cache {path}: {e}")
+
+    if not build:
+        return None, {"key": key, "hit": False, "path": str(path), "load_seconds": time.perf_counter() - t0}
+
+    gdf = _build_gdf(ua_geojson_path, resolution, seed=seed, partners=partners, team_leaders=team_leaders)
+    grid = RiskGrid.from_gdf(gdf, resolution)
+    del gdf
+    elapsed = time.perf_counter() - t0
+
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        atomic_write(path, grid.save)
+    except Exception as e:
+        print(f"⚠️  Could not write grid cache {path}: {e}")
+
+    info = {"key": key, "hit": False, "path": str(path), "load_seconds": elapsed}
+    return grid, info
@@ -0,0 +1,109 @@
+"""
+Viewport queries against the risk grid.
+
+A GridIndex wraps one dataset version's RiskGrid. Bounding boxes are resolved
+with lattice arithmetic, so a request materializes polygons only for the
+cells it returns. At low zoom levels neighbouring lattice cells are merged
+into coarser square blocks.
+"""
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+from risk_grid import UNASSIGNED, RiskGrid
+
+# Zoom level from which single cells (~1 km) are served without merging
+FULL_DETAIL_ZOOM = 10
+
+
+def parse_bbox(bbox: str):
+    """Parses ``"minx,miny,maxx,maxy"`` into floats; raises ValueError."""
+    parts = [float(v) for v in bbox.split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox needs four comma-separated numbers")
+    minx, miny, maxx, maxy = parts
+    if not (minx <= maxx and miny <= maxy):
+        raise ValueError("bbox must be minx,miny,maxx,maxy")
+    return minx, miny, maxx, maxy
+
+
+def block_factor(zoom) -> int:
+    """Number of lattice cells per block side at ``zoom`` (1 = no merging)."""
+    if zoom is None:
+        return 1
+    return 1 << max(0, FULL_DETAIL_ZOOM - int(zoom))
+
+
+class GridIndex:
+    """Bounding-box selection and block aggregation over a RiskGrid."""
+
+    def __init__(self, grid: RiskGrid):
+        self.grid = grid
+
+    def select(self, bbox=None, partner=None, min_risk=None) -> np.ndarray:
+        """
+        Sorted row positions of cells intersecting ``bbox`` that belong to
+        ``partner`` (any assigned partner if None) with risk >= ``min_risk``.
+        """
+        grid = self.grid
+        if bbox is None and partner is not None:
+            rows = grid.rows_of('partner', partner)
+        else:
+            rows = np.arange(len(grid)) if bbox is None else grid.rows_in_bbox(bbox)
+            codes = grid.partner_codes[rows]
+            if partner is None:
+                rows = rows[codes != grid.code_of('partner', UNASSIGNED)]
+            else:
+                rows = rows[codes == grid.code_of('partner', partner)]
+        if min_risk is not None:
+            rows = rows[grid.risk[rows] >= min_risk]
+        return rows
+
+    def frame(self, rows, columns, factor: int = 1) -> gpd.GeoDataFrame:
+        """
+        GeoDataFrame of ``rows`` restricted to ``columns``. With
+        ``factor > 1`` cells are merged into factor x factor lattice blocks
+        carrying the mean risk, the majority partner and leader and the cell
+        count.
+        """
+        grid = self.grid
+        if factor <= 1:
+            return grid.to_gdf(rows, columns)
+
+        i = grid.i[rows] // factor
+        j = grid.j[rows] // factor
+        _, block, counts = np.unique(np.stack([i, j], axis=1), axis=0, return_inverse=True, return_counts=True)
+        block = block.ravel()
+        n_blocks = len(counts)
+
+        risk = np.bincount(block, weights=grid.risk[rows], minlength=n_blocks) / counts
+
+        bounds = shapely.bounds(grid.geometry(rows))
+        lo = np.full((n_blocks, 2), np.inf)
+        hi = np.full((n_blocks, 2), -np.inf)
+        np.minimum.at(lo, block, bounds[:, :2])
+        np.maximum.at(hi, block, bounds[:, 2:])
+
+        props = {}
+        for c in columns:
+            if c == 'risk':
+                props[c] = risk
+            elif c == 'partner':
+                props[c] = _majority(block, n_blocks, grid.partners[grid.partner_codes[rows]])
+            elif c == 'leader':
+                props[c] = _majority(block, n_blocks, grid.leaders[grid.leader_codes[rows]])
+        props['cells'] = counts
+        return gpd.GeoDataFrame(
+            props,
+            geometry=shapely.box(lo[:, 0], lo[:, 1], hi[:, 0], hi[:, 1]),
+            crs=grid.crs,
+        )
+
+
+def _majority(block: np.ndarray, n_blocks: int, labels: np.ndarray) -> np.ndarray:
+    """Most frequent of ``labels`` in each block (ties go to the first label seen)."""
+    codes, names = pd.factorize(labels)
+    votes = np.zeros((n_blocks, len(names)), dtype=np.int64)
+    np.add.at(votes, (block, codes), 1)
+    return np.asarray(names)[votes.argmax(axis=1)] if len(names) else np.array([], dtype=object)
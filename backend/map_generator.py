@@ -1,32 +1,27 @@
 import geopandas as gpd
 import numpy as np
+import pandas as pd
+import shapely
 import random
-from shapely.geometry import Point, box
+from shapely.geometry import Point
 from shapely.ops import unary_union
 import matplotlib
 matplotlib.use("Agg")  # headless backend for PNG export
 import matplotlib.pyplot as plt
-from rtree import index as rtree_index
-from collections import deque
+from partition import lattice_adjacency, flood_fill
+from seeding import farthest_point_seeds
 import io
 
 
-def _build_gdf(ua_geojson_path: str = "ua.json") -> gpd.GeoDataFrame:
+def _make_mine_zone():
     """
-    Builds and returns a GeoDataFrame with columns:
-    - geometry: grid cell polygons
-    - risk: float risk value
-    - partner: assigned partner code (A/B/C) or "Unassigned"
+    Scatters random risk "blobs" (7 km radius) inside a 100 km radius around
+    Kharkiv and returns their union.
     """
-    # === Step 1: Load Ukraine boundary ===
-    ukraine = gpd.read_file(ua_geojson_path).to_crs("EPSG:4326")
-
-    # === Step 2: Define Kharkiv region (100 km radius) ===
     center_lat, center_lon = 49.988, 36.232
     radius_deg = 100 / 111  # approx degrees per 100 km
     kharkiv_region = Point(center_lon, center_lat).buffer(radius_deg)
 
-    # === Step 3: Generate risk "blobs" inside region ===
     blob_radius_deg = (7 / 111)
     target_area_km2 = 31000
     num_blobs = int(target_area_km2 / (np.pi * 7**2))
@@ -39,175 +34,191 @@ def _build_gdf(ua_geojson_path: str = "ua.json") -> gpd.GeoDataFrame:
         p = Point(x, y)
         if kharkiv_region.contains(p):
             blobs.append(p.buffer(blob_radius_deg))
-    mine_zone = unary_union(blobs)
+    return unary_union(blobs)
 
-    # === Step 4: Discretize mine zone into ~1 km² grid cells ===
-    resolution = 0.01  # ~1 km
+
+def _lattice_edges(start: float, stop: float, resolution: float) -> np.ndarray:
+    """
+    Lower cell edges ``start, start + r, start + 2r, ...`` below ``stop``.
+    Uses a sequential accumulate so the values match repeated ``x += r``
+    bit for bit.
+    """
+    n = int(np.ceil((stop - start) / resolution)) + 2
+    steps = np.full(n, resolution, dtype=float)
+    steps[0] = start
+    edges = np.add.accumulate(steps)
+    return edges[edges < stop]
+
+
+def _centroid_area(geometry):
+    """Exact centroid x, y and area of every polygon, as float64 arrays."""
+    geometry = np.asarray(geometry)
+    xy = shapely.get_coordinates(shapely.centroid(geometry))
+    return xy[:, 0], xy[:, 1], shapely.area(geometry)
+
+
+def _build_grid(mine_zone, boundary: gpd.GeoDataFrame, resolution: float = 0.01) -> gpd.GeoDataFrame:
+    """
+    Discretizes the bounding box of ``mine_zone`` into square cells of size
+    ``resolution`` and clips them to ``boundary``.
+
+    Cells are generated column by column (x outer, y inner) and risk is drawn
+    from ``random.gauss`` in that order for cells fully inside the mine zone,
+    so for a fixed seed the result equals an ``overlay`` of the full grid.
+    Only cells crossing a boundary edge are actually intersected.
+
+    The integer lattice coordinates of every cell are kept in columns ``i``
+    (column, along x) and ``j`` (row, along y), and its exact centroid and
+    area in float64 columns ``centroid_x``, ``centroid_y`` and ``area``.
+    """
     minx, miny, maxx, maxy = mine_zone.bounds
-    cells = []
-    x = minx
-    while x < maxx:
-        y = miny
-        while y < maxy:
-            cell = box(x, y, x + resolution, y + resolution)
-            risk = random.gauss(0.5, 0.2) if mine_zone.contains(cell) else 0
-            risk = float(max(0, min(1, risk)))
-            cells.append({
-                'geometry': cell,
-                'risk': risk
-            })
-            y += resolution
-        x += resolution
-
-    mine_risk_gdf = gpd.GeoDataFrame(cells, crs="EPSG:4326")
-    # Clip to Ukraine boundary
-    mine_risk_gdf = gpd.overlay(mine_risk_gdf, ukraine, how="intersection")
+    xs = _lattice_edges(minx, maxx, resolution)
+    ys = _lattice_edges(miny, maxy, resolution)
+    x0 = np.repeat(xs, len(ys))
+    y0 = np.tile(ys, len(xs))
+    lat_i = np.repeat(np.arange(len(xs)), len(ys))
+    lat_j = np.tile(np.arange(len(ys)), len(xs))
+    x1 = x0 + resolution
+    y1 = y0 + resolution
+    cells = shapely.box(x0, y0, x1, y1)
+
+    shapely.prepare(mine_zone)
+    inside = shapely.contains(mine_zone, cells)
+    risk = np.zeros(len(cells))
+    for k in np.flatnonzero(inside):
+        risk[k] = random.gauss(0.5, 0.2)
+    np.clip(risk, 0, 1, out=risk)
+
+    # Pair every cell with the boundary features it touches
+    boundary = boundary.reset_index(drop=True)
+    shapes = boundary.geometry.values
+    feat_idx, cell_idx = shapely.STRtree(cells).query(shapes, predicate="intersects")
+    order = np.lexsort((feat_idx, cell_idx))
+    feat_idx, cell_idx = feat_idx[order], cell_idx[order]
+
+    shapely.prepare(shapes)
+    interior = shapely.contains_properly(shapes[feat_idx], cells[cell_idx])
+
+    # Interior cells are their own intersection; GEOS emits them clockwise
+    attrs = boundary.drop(columns=boundary.geometry.name)
+    inner = attrs.take(feat_idx[interior]).reset_index(drop=True)
+    inner.insert(0, "risk", risk[cell_idx[interior]])
+    ci = cell_idx[interior]
+    inner["i"] = lat_i[ci]
+    inner["j"] = lat_j[ci]
+    inner["__cell"] = ci
+    inner = gpd.GeoDataFrame(
+        inner,
+        geometry=shapely.box(x0[ci], y0[ci], x1[ci], y1[ci], ccw=False),
+        crs=boundary.crs,
+    )
+
+    # Cells crossing the border go through a regular overlay
+    edge_cells = np.unique(cell_idx[~interior])
+    parts = [inner]
+    if len(edge_cells):
+        edge = gpd.GeoDataFrame(
+            {"risk": risk[edge_cells], "i": lat_i[edge_cells], "j": lat_j[edge_cells], "__cell": edge_cells},
+            geometry=cells[edge_cells],
+            crs=boundary.crs,
+        )
+        edge = gpd.overlay(edge, boundary, how="intersection")
+        parts.append(edge[inner.columns])
+
+    grid = pd.concat(parts, ignore_index=True)
+    grid = grid.sort_values("__cell", kind="stable").drop(columns="__cell")
+    grid = grid.reset_index(drop=True)
+    grid["centroid_x"], grid["centroid_y"], grid["area"] = _centroid_area(grid.geometry.values)
+    return grid
+
+
+# Partner capacities; cells are shared out proportionally to total risk
+PARTNER_SHARES = {'A': 10000, 'B': 7000, 'C': 3000}
+
+# Team leaders per partner; each partner's cells are split evenly among them
+TEAM_LEADERS = {
+    'A': ['A1', 'A2', 'A3'],
+    'B': ['B1', 'B2'],
+    'C': ['C1'],
+}
+
+
+def _build_gdf(
+    ua_geojson_path: str = "ua.json",
+    resolution: float = 0.01,
+    seed: int = None,
+    partners: dict = None,
+    team_leaders: dict = None,
+) -> gpd.GeoDataFrame:
+    """
+    Builds and returns a GeoDataFrame with columns:
+    - geometry: grid cell polygons
+    - risk: float risk value
+    - partner: assigned partner code (A/B/C) or "Unassigned"
+    - leader: assigned team leader (e.g. A1) or "Unassigned"
+    - i, j: integer lattice coordinates of the cell
+    - centroid_x, centroid_y, area: exact centroid and area of the cell
+
+    ``seed`` reseeds ``random`` first so the result is reproducible;
+    ``partners`` and ``team_leaders`` default to PARTNER_SHARES and
+    TEAM_LEADERS.
+    """
+    if seed is not None:
+        random.seed(seed)
+    partners = PARTNER_SHARES if partners is None else partners
+    team_leaders = TEAM_LEADERS if team_leaders is None else team_leaders
+
+    # === Step 1: Load Ukraine boundary ===
+    ukraine = gpd.read_file(ua_geojson_path).to_crs("EPSG:4326")
+
+    # === Steps 2-3: Generate risk "blobs" inside the Kharkiv region ===
+    mine_zone = _make_mine_zone()
+
+    # === Step 4: Discretize mine zone into ~1 km² grid cells ===
+    mine_risk_gdf = _build_grid(mine_zone, ukraine, resolution)
     gdf = mine_risk_gdf.copy()
 
     # === Step 5: Partition cells among partners via flood-fill ===
-    partners = { 'A': 10000, 'B': 7000, 'C': 3000 }
     total = sum(partners.values())
     partners = {k: v / total for k, v in partners.items()}
 
     total_risk = gdf['risk'].sum()
     targets = {p: total_risk * share for p, share in partners.items()}
-    allocated = {p: 0.0 for p in partners}
 
-    # Build spatial index
+    # Lattice adjacency, built once and shared by partner and leader fills
     gdf['id'] = gdf.index
-    gdf['centroid'] = gdf.geometry.centroid
-    idx = rtree_index.Index()
-    for i, geom in enumerate(gdf.geometry):
-        idx.insert(i, geom.bounds)
-
-    # Seed selection
-    def pick_seed(existing_ids):
-        if not existing_ids:
-            return gdf.loc[gdf.centroid.y.idxmin()]
-        used = gdf.loc[list(existing_ids)].centroid.to_numpy()
-        allc = gdf.centroid.to_numpy()
-        best, maxd = None, -1
-        for i, c in enumerate(allc):
-            if i in existing_ids: continue
-            d = min(np.linalg.norm(np.array(c.coords[0]) - np.array(u.coords[0])) for u in used)
-            if d > maxd:
-                maxd, best = d, i
-        return gdf.loc[best]
-
-    assigned = {}
-    frontiers = {}
-    used_ids = set()
-
-    for p in partners:
-        seed = pick_seed(used_ids)
-        sid = seed['id']
-        frontiers[p] = deque([sid])
-        assigned[sid] = p
-        allocated[p] += gdf.loc[sid, 'risk']
-        used_ids.add(sid)
-
-    # Neighbor finder
-    def neighbors(cell_id):
-        geom = gdf.loc[cell_id].geometry
-        for nbr in idx.intersection(geom.bounds):
-            if nbr not in assigned and geom.touches(gdf.loc[nbr].geometry):
-                yield nbr
+    indptr, indices = lattice_adjacency(gdf['i'], gdf['j'], gdf.geometry.values, resolution, area=gdf['area'])
+
+    # Seed selection: farthest-point sampling from the southernmost cell
+    xy = gdf[['centroid_x', 'centroid_y']].to_numpy()
+    seed_rows = farthest_point_seeds(xy, len(partners), first=int(np.argmin(xy[:, 1])))
+    seeds = dict(zip(partners, seed_rows))
 
     # Flood-fill allocation
-    active = set(partners.keys())
-    while active:
-        for p in list(active):
-            if not frontiers[p]:
-                active.remove(p)
-                continue
-            current = frontiers[p].popleft()
-            for nbr in neighbors(current):
-                if nbr in assigned: continue
-                assigned[nbr] = p
-                allocated[p] += gdf.loc[nbr, 'risk']
-                frontiers[p].append(nbr)
-                if allocated[p] >= targets[p]:
-                    active.remove(p)
-                    break
-
-    gdf['partner'] = gdf['id'].map(assigned).fillna("Unassigned")
+    owner = flood_fill(indptr, indices, seeds, targets, weights=gdf['risk'].to_numpy())
+    # owner is -1 for unreached cells, which picks the trailing "Unassigned"
+    labels = np.array(list(partners) + ["Unassigned"], dtype=object)
+    gdf['partner'] = labels[owner]
     
     
-    # === Leader definitions ===
-    team_leaders = {
-        'A': ['A1', 'A2', 'A3'],
-        'B': ['B1', 'B2'],
-        'C': ['C1'],
-    }
-
     gdf['leader'] = "Unassigned"
     
-    # === Helper to pick well-separated seeds ===
-    def pick_multiple_seeds(local_gdf, num_seeds):
-        centroids = np.array([pt.coords[0] for pt in local_gdf.geometry.centroid])
-        chosen = []
-        remaining = list(range(len(local_gdf)))
-        if not remaining:
-            return []
-        first = np.argmin(centroids[:, 1] + centroids[:, 0])
-        chosen.append(first)
-        remaining.remove(first)
-        while len(chosen) < num_seeds and remaining:
-            dists = [(min(np.linalg.norm(centroids[i] - centroids[c]) for c in chosen), i) for i in remaining]
-            dists.sort(reverse=True)
-            chosen.append(dists[0][1])
-            remaining.remove(dists[0][1])
-        return local_gdf.iloc[chosen].index.tolist()   
-    
     # === Subdivide each partner into contiguous leader zones ===
     for partner, leaders in team_leaders.items():
-        sub_gdf = gdf[gdf.partner == partner].copy()
-        sub_gdf['orig_id'] = sub_gdf.index
-        sub_gdf = sub_gdf.reset_index(drop=True)
-        sub_gdf['sub_id'] = sub_gdf.index
-        target_cells = len(sub_gdf) // len(leaders)
-
-        geom_idx = rtree_index.Index()
-        for i, geom in enumerate(sub_gdf.geometry):
-            geom_idx.insert(i, geom.bounds)
-
-        seed_ids = pick_multiple_seeds(sub_gdf, len(leaders))
-
-        assigned = {}
-        frontiers = {}
-        allocated = {l: 0 for l in leaders}
-
-        for lid, sid in zip(leaders, seed_ids):
-            assigned[sid] = lid
-            frontiers[lid] = deque([sid])
-            allocated[lid] += 1
-
-        def get_local_neighbors(idx):
-            geom = sub_gdf.loc[idx].geometry
-            candidates = list(geom_idx.intersection(geom.bounds))
-            return [i for i in candidates if i != idx and i not in assigned and geom.touches(sub_gdf.loc[i].geometry)]
-
-        active = set(leaders)
-        while active:
-            for lid in list(active):
-                frontier = frontiers[lid]
-                if not frontier:
-                    active.remove(lid)
-                    continue
-                current = frontier.popleft()
-                neighbors = get_local_neighbors(current)
-                for nbr in neighbors:
-                    if nbr in assigned:
-                        continue
-                    assigned[nbr] = lid
-                    allocated[lid] += 1
-                    frontier.append(nbr)
-                    if allocated[lid] >= target_cells:
-                        active.remove(lid)
-                        break
-
-        id_to_leader = {sub_gdf.loc[i, 'orig_id']: lid for i, lid in assigned.items()}
-        gdf.loc[gdf.partner == partner, 'leader'] = gdf[gdf.partner == partner].index.map(id_to_leader).fillna("Unassigned")
+        in_partner = (gdf.partner == partner).to_numpy()
+        rows = np.flatnonzero(in_partner)
+        target_cells = len(rows) // len(leaders)
+
+        # Well-separated seeds, starting from the south-western corner
+        sub_xy = xy[rows]
+        seed_rows = farthest_point_seeds(sub_xy, len(leaders), first=int(np.argmin(sub_xy[:, 1] + sub_xy[:, 0])), prefer="last")
+        seeds = {lid: rows[s] for lid, s in zip(leaders, seed_rows)}
+        if not seeds:
+            continue
+
+        owner = flood_fill(indptr, indices, seeds, {lid: target_cells for lid in seeds}, eligible=in_partner)
+        labels = np.array(list(seeds) + ["Unassigned"], dtype=object)
+        gdf.loc[in_partner, 'leader'] = labels[owner[in_partner]]
     
     # Return the completed GDF after all partners have been processed
     return gdf
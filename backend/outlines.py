@@ -0,0 +1,189 @@
+"""
+Dissolved partner and team-leader outlines for map overlays.
+
+Cells on the lattice are merged by tracing the boundary of each group's cell
+bitmap instead of a generic polygon union: every cell side between two
+different groups is a boundary edge, oriented with its group on the left,
+and following the edges around gives each group's rings, already dissolved.
+Collinear vertices are dropped, so a ring only has vertices where the
+outline turns. Counter-clockwise rings are shells and clockwise rings holes.
+Cells clipped by the border keep their own geometry and are unioned into
+their group's outline afterwards.
+"""
+import geopandas as gpd
+import numpy as np
+import shapely
+
+from risk_grid import UNASSIGNED, RiskGrid
+
+LEVELS = ("leader", "partner")
+
+# Edge directions in counter-clockwise order: +x, +y, -x, -y
+_DX = np.array([1, 0, -1, 0])
+_DY = np.array([0, 1, 0, -1])
+
+
+def trace_rings(bitmap: np.ndarray):
+    """
+    Boundary rings of the groups in ``bitmap``, a (columns, rows) array of
+    group codes with -1 for no group. Returns ``(codes, rings)``: the group
+    of each ring and its (k, 2) integer lattice vertices, closed. Cells
+    touching only at a corner end up in separate rings.
+    """
+    nx, ny = bitmap.shape
+    b = np.full((nx + 2, ny + 2), -1, dtype=np.int64)
+    b[1:-1, 1:-1] = bitmap
+    inner = b[1:-1, 1:-1]
+    # Vertex (a, b) of the padded lattice has id a * width + b
+    width = ny + 3
+
+    starts, dirs, codes = [], [], []
+    p, q = np.meshgrid(np.arange(1, nx + 1), np.arange(1, ny + 1), indexing="ij")
+    for d, neighbour, (sa, sb) in (
+        (0, b[1:-1, :-2], (0, 0)),   # bottom side, from the lower left corner
+        (1, b[2:, 1:-1], (1, 0)),    # right side, from the lower right corner
+        (2, b[1:-1, 2:], (1, 1)),    # top side, from the upper right corner
+        (3, b[:-2, 1:-1], (0, 1)),   # left side, from the upper left corner
+    ):
+        side = (inner >= 0) & (neighbour != inner)
+        starts.append((p[side] + sa) * width + q[side] + sb)
+        dirs.append(np.full(int(side.sum()), d))
+        codes.append(inner[side])
+    starts, dirs, codes = np.concatenate(starts), np.concatenate(dirs), np.concatenate(codes)
+    if len(starts) == 0:
+        return np.zeros(0, dtype=np.int64), []
+
+    # A directed side belongs to exactly one group, so (start, direction) is unique
+    keys = starts * 4 + dirs
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+
+    def lookup(wanted):
+        pos = np.minimum(np.searchsorted(sorted_keys, wanted), len(keys) - 1)
+        return np.where(sorted_keys[pos] == wanted, order[pos], -1)
+
+    ends = starts + _DX[dirs] * width + _DY[dirs]
+    # Turn left where possible, so rings separate where cells touch at a corner
+    nxt = lookup(ends * 4 + (dirs + 1) % 4)
+    for turn in (0, 3):
+        missing = nxt < 0
+        nxt[missing] = lookup(ends[missing] * 4 + (dirs[missing] + turn) % 4)
+
+    ring_codes, rings = [], []
+
+    def add_ring(edges):
+        edges = np.array(edges)
+        # Keep only the corners: edges whose direction differs from the previous edge's
+        corners = edges[dirs[edges] != dirs[np.roll(edges, 1)]]
+        vertices = np.column_stack((starts[corners] // width - 1, starts[corners] % width - 1))
+        rings.append(np.vstack((vertices, vertices[:1])))
+        ring_codes.append(codes[edges[0]])
+
+    seen = np.zeros(len(starts), dtype=bool)
+    for first in range(len(starts)):
+        if seen[first]:
+            continue
+        # Split the cycle wherever it revisits a vertex; the loop closed there
+        # is a hole (clockwise) touching the rest at that single point
+        stack, position = [], {}
+        e = first
+        while not seen[e]:
+            seen[e] = True
+            k = position.get(starts[e])
+            if k is not None:
+                add_ring(stack[k:])
+                for popped in stack[k:]:
+                    del position[starts[popped]]
+                del stack[k:]
+            position[starts[e]] = len(stack)
+            stack.append(e)
+            e = nxt[e]
+        add_ring(stack)
+    return np.array(ring_codes, dtype=np.int64), rings
+
+
+def _polygons(rings, x_lines: np.ndarray, y_lines: np.ndarray):
+    """Assembles one group's rings into polygons, each hole inside the smallest shell around it."""
+    shells = [k for k, r in enumerate(rings) if _ccw(r)]
+    holes = [k for k, r in enumerate(rings) if not _ccw(r)]
+    coords = [np.column_stack((x_lines[r[:, 0]], y_lines[r[:, 1]])) for r in rings]
+
+    owners = {k: [] for k in shells}
+    if len(shells) == 1:
+        owners[shells[0]] = holes
+    elif holes:
+        shell_polys = [shapely.Polygon(coords[k]) for k in shells]
+        by_area = np.argsort([p.area for p in shell_polys])
+        for h in holes:
+            # A point half a cell to the right of the hole's first edge lies in the hole
+            (a0, b0), (a1, b1) = rings[h][0], rings[h][1]
+            dx, dy = np.sign(a1 - a0), np.sign(b1 - b0)
+            px, py = a0 + 0.5 * dx + 0.5 * dy, b0 + 0.5 * dy - 0.5 * dx
+            x = np.interp(px, np.arange(len(x_lines)), x_lines)
+            y = np.interp(py, np.arange(len(y_lines)), y_lines)
+            for s in by_area:
+                if shapely.contains_xy(shell_polys[s], x, y):
+                    owners[shells[s]].append(h)
+                    break
+    return [shapely.Polygon(coords[s], [coords[h] for h in owners[s]]) for s in shells]
+
+
+def _ccw(ring: np.ndarray) -> bool:
+    """Whether a closed ring turns counter-clockwise (positive shoelace area)."""
+    x, y = ring[:, 0].astype(np.float64), ring[:, 1].astype(np.float64)
+    return float(np.dot(x[:-1], y[1:]) - np.dot(x[1:], y[:-1])) > 0
+
+
+def dissolve(grid: RiskGrid, level: str) -> gpd.GeoDataFrame:
+    """
+    One row per assigned leader (or partner) with its dissolved
+    (Multi)Polygon, ``num_cells``, ``total_risk`` and ``avg_risk``; leader
+    rows also carry their ``partner``. Leaders are in order of first
+    appearance in the grid and partners in name order.
+    """
+    if level not in LEVELS:
+        raise ValueError(f"level must be one of {LEVELS}, got {level!r}")
+    assigned = grid.partner_codes != grid.code_of('partner', UNASSIGNED)
+    if level == "leader":
+        codes = np.where(assigned & (grid.leader_codes != grid.code_of('leader', UNASSIGNED)), grid.leader_codes, -1)
+        labels, groups = grid.leaders, grid.by_leader
+    else:
+        codes = np.where(assigned, grid.partner_codes, -1)
+        labels, groups = grid.partners, grid.by_partner
+
+    present = np.flatnonzero(np.bincount(codes[codes >= 0], minlength=len(labels)))
+    if level == "leader":
+        present = present[np.argsort(groups.first_rows()[present])]
+
+    # Lattice cells go into the bitmap; clipped cells are unioned in below
+    clipped = np.zeros(len(grid), dtype=bool)
+    clipped[grid.clipped_rows] = True
+    bitmap = np.full((len(grid.x_edges), len(grid.y_edges)), -1, dtype=np.int64)
+    lattice = ~clipped & (codes >= 0)
+    bitmap[grid.i[lattice], grid.j[lattice]] = codes[lattice]
+    ring_codes, rings = trace_rings(bitmap)
+
+    x_lines, y_lines = grid.x_lines, grid.y_lines
+    counts = np.bincount(codes[codes >= 0], minlength=len(labels))
+    totals = np.bincount(codes[codes >= 0], weights=grid.risk[codes >= 0], minlength=len(labels))
+
+    records, geoms = [], []
+    for code in present:
+        parts = _polygons([rings[k] for k in np.flatnonzero(ring_codes == code)], x_lines, y_lines)
+        border = grid.clipped_geoms[np.flatnonzero(codes[grid.clipped_rows] == code)]
+        if len(border):
+            geom = shapely.union_all(np.concatenate((np.array(parts, dtype=object), border)))
+        else:
+            geom = parts[0] if len(parts) == 1 else shapely.MultiPolygon(parts)
+        geoms.append(geom)
+
+        record = {level: labels[code]}
+        if level == "leader":
+            record["partner"] = grid.partners[grid.partner_codes[groups.first_rows()[code]]]
+        record.update(num_cells=int(counts[code]), total_risk=float(totals[code]),
+                      avg_risk=float(totals[code] / counts[code]))
+        records.append(record)
+
+    columns = [level] + (["partner"] if level == "leader" else []) + ["num_cells", "total_risk", "avg_risk"]
+    return gpd.GeoDataFrame(records, columns=columns, geometry=gpd.array.from_shapely(np.array(geoms, dtype=object)),
+                            crs=grid.crs)
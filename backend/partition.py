@@ -0,0 +1,117 @@
+"""
+Lattice partitioning engine.
+
+Grid cells built by ``map_generator._build_grid`` carry integer lattice
+coordinates ``(i, j)``. Neighbours are found by lattice arithmetic and stored
+once as a CSR adjacency array, so the flood fill only touches plain integers
+instead of querying a spatial index and calling ``touches`` per candidate.
+"""
+from collections import deque
+
+import numpy as np
+import shapely
+
+# Cells sharing an edge or a corner touch each other
+_OFFSETS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+
+
+def lattice_adjacency(i, j, geometry=None, resolution: float = None, area=None):
+    """
+    Builds the CSR adjacency ``(indptr, indices)`` of cells keyed by lattice
+    coordinates ``(i, j)`` (one row per lattice cell).
+
+    Two cells are adjacent when they are 8-neighbours on the lattice. If
+    ``geometry`` and ``resolution`` are given, pairs involving a cell that was
+    clipped by the border are confirmed with ``touches``; ``area`` (cell
+    areas, computed from ``geometry`` if None) tells clipped cells apart.
+    Neighbours of row
+    ``r`` are ``indices[indptr[r]:indptr[r + 1]]``, sorted by row.
+    """
+    i = np.asarray(i, dtype=np.int64)
+    j = np.asarray(j, dtype=np.int64)
+    n = len(i)
+    if n == 0:
+        return np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    # Pad by one cell on each side so neighbour keys never wrap around
+    stride = int(j.max() - j.min()) + 3
+    key = (i - i.min() + 1) * stride + (j - j.min() + 1)
+    order = np.argsort(key, kind="stable")
+    sorted_keys = key[order]
+
+    src, dst = [], []
+    for di, dj in _OFFSETS:
+        target = key + di * stride + dj
+        pos = np.minimum(np.searchsorted(sorted_keys, target), n - 1)
+        hit = sorted_keys[pos] == target
+        src.append(np.flatnonzero(hit))
+        dst.append(order[pos[hit]])
+    src = np.concatenate(src)
+    dst = np.concatenate(dst)
+
+    if geometry is not None and resolution is not None:
+        geometry = np.asarray(geometry)
+        area = shapely.area(geometry) if area is None else np.asarray(area, dtype=float)
+        clipped = area < resolution ** 2 * (1 - 1e-6)
+        check = clipped[src] | clipped[dst]
+        keep = np.ones(len(src), dtype=bool)
+        keep[check] = shapely.touches(geometry[src[check]], geometry[dst[check]])
+        src, dst = src[keep], dst[keep]
+
+    order = np.lexsort((dst, src))
+    src, dst = src[order], dst[order]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+    return indptr, dst
+
+
+def flood_fill(indptr, indices, seeds: dict, targets: dict, weights=None, eligible=None) -> np.ndarray:
+    """
+    Multi-source round-robin flood fill over a CSR adjacency.
+
+    ``seeds`` maps each label to its seed row and ``targets`` to the weight
+    it should collect. Each round every active label pops one cell from its
+    frontier and claims the unassigned (and ``eligible``) neighbours, stopping
+    as soon as its allocated weight reaches the target. ``weights`` defaults
+    to one per cell.
+
+    Returns an array with the position of the owning label in ``seeds`` for
+    every row, or -1 for rows that were never reached.
+    """
+    n = len(indptr) - 1
+    ptr = np.asarray(indptr).tolist()
+    nbrs = np.asarray(indices).tolist()
+    w = [1] * n if weights is None else np.asarray(weights, dtype=float).tolist()
+    ok = [True] * n if eligible is None else np.asarray(eligible, dtype=bool).tolist()
+
+    labels = list(seeds)
+    owner = [-1] * n
+    allocated = []
+    frontiers = []
+    for code, label in enumerate(labels):
+        sid = int(seeds[label])
+        owner[sid] = code
+        allocated.append(w[sid])
+        frontiers.append(deque([sid]))
+    target = [targets[label] for label in labels]
+
+    active = list(range(len(labels)))
+    while active:
+        for code in list(active):
+            frontier = frontiers[code]
+            if not frontier:
+                active.remove(code)
+                continue
+            current = frontier.popleft()
+            for k in range(ptr[current], ptr[current + 1]):
+                nbr = nbrs[k]
+                if owner[nbr] != -1 or not ok[nbr]:
+                    continue
+                owner[nbr] = code
+                allocated[code] += w[nbr]
+                frontier.append(nbr)
+                if allocated[code] >= target[code]:
+                    active.remove(code)
+                    break
+
+    return np.asarray(owner, dtype=np.int64)
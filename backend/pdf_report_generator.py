@@ -1,104 +1,259 @@
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-import pandas as pd
-import matplotlib.pyplot as plt
-from fpdf import FPDF
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
+from fpdf import FPDF, FPDF_VERSION
 import seaborn as sns
 from pathlib import Path
 
-def create_pdf():
-    # 1. Load Excel file
-    asset_path = Path(__file__).parent.parent / "assets" 
-    op_path = asset_path / "operator_monthly_example.xlsx"
-    tl_path = asset_path / "teamlead_monthly_example.xlsx"
-
-    # 2. Assume sheets
-    df_operator = pd.read_excel(op_path, sheet_name=0)  # Sheet has: Month, Sector, Operator, MinesFound
-    df_operator['Month'] = df_operator['Month'].dt.strftime('%Y-%m')  # Ensure Month is datetime type
-    df_operator['Sector'] = df_operator['Sector'].astype(str)  # Ensure Sector is string type
-    df_operator['Operator'] = df_operator['Operator'].astype(str)  # Ensure Operator is string type
-    df_operator['MinesFound'] = df_operator['MinesFound'].fillna(0)  # Handle NaN values
-    # x,y = df_operator.shape()  # Debugging line to check data
-
-    df_teamlead = pd.read_excel(tl_path, sheet_name=0)  # Sheet has: Month, Operator, SectorAllotted
-    df_teamlead['Month'] = df_teamlead['Month'].dt.strftime('%Y-%m')  # Ensure Month is datetime type
-    df_teamlead['Operator'] = df_teamlead['Operator'].astype(str)  # Ensure Operator is string type 
-    df_teamlead['SectorAllotted'] = df_teamlead['SectorAllotted'].astype(str)  # Ensure SectorAllotted is string type
-
-    # 3. Aggregate Operator stats
-    mines_by_sector = df_operator.groupby(['Month', 'Sector'])['MinesFound'].sum().unstack()
-    mines_by_operator = df_operator.groupby(['Operator'])['MinesFound'].agg(['sum', 'mean', 'min', 'max'])
-
-    # 4. Aggregate TeamLead stats
-    assignments = df_teamlead.groupby(['Month', 'Operator']).count().unstack(fill_value=0)
-    assignments.columns = assignments.columns.droplevel()
-
-    # 5. Plot: Mines per Sector per Month
-    plt.figure(figsize=(10, 6))
-    mines_by_sector.plot(kind='bar', stacked=True)
-    plt.title("Mines Found per Sector per Month")
-    plt.xlabel("Month")
-    plt.ylabel("Mines Found")
-    plt.tight_layout()
-    plt.savefig(asset_path / "bar_sector_month.png")
-    plt.close()
-
-    plt.figure(figsize=(10, 6))
-    mines_by_operator.plot(kind='bar', y=['sum', 'mean', 'min', 'max'], rot=0)
-    plt.title("Operator-wise Mines Statistics")
-    plt.xlabel("Operator")
-    plt.ylabel("Mines Found")
-    plt.xticks(rotation=0)
-    plt.legend(title="Statistic")
-    plt.tight_layout()
-    plt.savefig(asset_path / "mines_by_operator.png")
-    plt.close()
-
-    # 6. Plot: Operator Assignment Heatmap
-    plt.figure(figsize=(8, 6))
-    sns.heatmap(assignments, annot=True, cmap="YlGnBu", fmt='d')
-    plt.title("Sector Assignments by TeamLead")
-    plt.ylabel("Month")
-    plt.tight_layout()
-    plt.savefig(asset_path / "heatmap_assignments.png")
-    plt.close()
-
-    # 7. Create PDF
-    final_path = asset_path / "ngo_activity_report.pdf"
-    
+from report_store import ReportStore
+
+ASSET_PATH = Path(__file__).parent.parent / "assets"
+OPERATOR_XLSX = ASSET_PATH / "operator_monthly_example.xlsx"
+TEAMLEAD_XLSX = ASSET_PATH / "teamlead_monthly_example.xlsx"
+
+# fpdf2 (2.x) reads images from memory; the legacy PyFPDF 1.x only from files
+_IMAGES_FROM_MEMORY = int(FPDF_VERSION.split(".")[0]) >= 2
+
+
+# === Chart rendering ===
+
+class _Canvas:
+    """A Figure on its own Agg canvas, cleared and redrawn for every report."""
+
+    def __init__(self, figsize):
+        self.figure = Figure(figsize=figsize)
+        FigureCanvasAgg(self.figure)
+        self.lock = threading.Lock()
+
+
+_canvases = {}
+_canvases_lock = threading.Lock()
+
+
+def _canvas(name: str, figsize) -> _Canvas:
+    with _canvases_lock:
+        canvas = _canvases.get(name)
+        if canvas is None:
+            canvas = _canvases[name] = _Canvas(figsize)
+        return canvas
+
+
+def _render_chart(name: str, data):
+    """
+    Draws chart ``name`` for ``data`` on the reused canvas for that chart and
+    returns ``(png_bytes, seconds)``.
+    """
+    t0 = time.perf_counter()
+    figsize, draw = CHARTS[name]
+    canvas = _canvas(name, figsize)
+    with canvas.lock:
+        fig = canvas.figure
+        fig.clear()
+        draw(fig.add_subplot(), data)
+        fig.tight_layout()
+        fig.canvas.draw()
+        # Opaque RGB: PyFPDF splits alpha channels pixel by pixel in Python
+        rgb = np.asarray(fig.canvas.buffer_rgba())[..., :3]
+        buf = io.BytesIO()
+        Image.fromarray(rgb).save(buf, format="PNG")
+    return buf.getvalue(), time.perf_counter() - t0
+
+
+def _draw_sector_month(ax, mines_by_sector):
+    mines_by_sector.plot(kind='bar', stacked=True, ax=ax)
+    ax.set_title("Mines Found per Sector per Month")
+    ax.set_xlabel("Month")
+    ax.set_ylabel("Mines Found")
+
+
+def _draw_operator_stats(ax, mines_by_operator):
+    mines_by_operator.plot(kind='bar', y=['sum', 'mean', 'min', 'max'], rot=0, ax=ax)
+    ax.set_title("Operator-wise Mines Statistics")
+    ax.set_xlabel("Operator")
+    ax.set_ylabel("Mines Found")
+    ax.legend(title="Statistic")
+
+
+def _draw_assignments(ax, assignments):
+    sns.heatmap(assignments, annot=True, cmap="YlGnBu", fmt='d', ax=ax)
+    ax.set_title("Sector Assignments by TeamLead")
+    ax.set_ylabel("Month")
+
+
+# Chart name -> (figure size in inches, draw(ax, data))
+CHARTS = {
+    "bar_sector_month": ((10, 6), _draw_sector_month),
+    "mines_by_operator": ((10, 6), _draw_operator_stats),
+    "heatmap_assignments": ((8, 6), _draw_assignments),
+}
+
+# Matplotlib holds the GIL while drawing, so charts run in worker processes
+_chart_pool = None
+_chart_pool_lock = threading.Lock()
+
+
+def _get_chart_pool() -> ProcessPoolExecutor:
+    global _chart_pool
+    with _chart_pool_lock:
+        if _chart_pool is None:
+            _chart_pool = ProcessPoolExecutor(len(CHARTS), mp_context=multiprocessing.get_context("spawn"))
+        return _chart_pool
+
+
+def _render_charts(data: dict, parallel: bool, timings: dict) -> dict:
+    """PNG bytes per chart name; with ``parallel`` each chart renders in its own process."""
+    results = None
+    if parallel:
+        try:
+            pool = _get_chart_pool()
+            futures = {name: pool.submit(_render_chart, name, data[name]) for name in CHARTS}
+            results = {name: f.result() for name, f in futures.items()}
+        except BrokenProcessPool:
+            global _chart_pool
+            with _chart_pool_lock:
+                _chart_pool = None
+    if results is None:
+        results = {name: _render_chart(name, data[name]) for name in CHARTS}
+
+    for name, (_, seconds) in results.items():
+        timings[f"chart_{name}"] = seconds
+    return {name: png for name, (png, _) in results.items()}
+
+
+# === PDF output ===
+
+def _pdf_image(pdf, png: bytes, **kwargs):
+    """Places PNG bytes on the current PDF page."""
+    if _IMAGES_FROM_MEMORY:
+        pdf.image(io.BytesIO(png), **kwargs)
+        return
+    # PyFPDF parses the file inside image(), so a private temp file is enough
+    fd, path = tempfile.mkstemp(suffix=".png")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(png)
+        pdf.image(path, **kwargs)
+    finally:
+        os.remove(path)
+
+
+def _pdf_bytes(pdf) -> bytes:
+    if _IMAGES_FROM_MEMORY:
+        return bytes(pdf.output())
+    return pdf.output(dest="S").encode("latin-1")
+
+
+def _usable_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def _get_default_store() -> ReportStore:
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ReportStore()
+        return _default_store
+
+
+def build_report(op_path=OPERATOR_XLSX, tl_path=TEAMLEAD_XLSX, timings: dict = None, parallel: bool = None,
+                 store: ReportStore = None) -> bytes:
+    """
+    Renders the NGO activity report for the two spreadsheets and returns the
+    PDF bytes. The spreadsheets are ingested into ``store`` (the default
+    ReportStore if None) and the report reads its pre-aggregated tables.
+    When ``timings`` is a dict it receives the seconds spent in each stage
+    (ingest, aggregate, charts and each chart_*, pdf). With
+    ``parallel`` the charts render concurrently in a persistent process pool;
+    by default that happens only when more than one CPU is available.
+    """
+    timings = {} if timings is None else timings
+    if parallel is None:
+        parallel = _usable_cpus() > 1
+    t0 = time.perf_counter()
+
+    # 1. Bring the store up to date; unchanged spreadsheets and months are skipped
+    store = store or _get_default_store()
+    store.ingest(op_path, tl_path)
+    t1 = time.perf_counter()
+    timings["ingest"] = t1 - t0
+
+    # 2. Read the pre-aggregated Operator and TeamLead stats
+    mines_by_sector = store.mines_by_sector()
+    mines_by_operator = store.operator_stats()
+    assignments = store.assignments()
+    summary = store.summary()
+    t2 = time.perf_counter()
+    timings["aggregate"] = t2 - t1
+
+    # 3. Plot the three charts, each on its own reused canvas
+    pngs = _render_charts({
+        "bar_sector_month": mines_by_sector,
+        "mines_by_operator": mines_by_operator,
+        "heatmap_assignments": assignments,
+    }, parallel, timings)
+    t3 = time.perf_counter()
+    timings["charts"] = t3 - t2
+
+    # 4. Create PDF
     pdf = FPDF()
     pdf.set_auto_page_break(auto=True, margin=15)
     pdf.add_page()
     pdf.set_font("Arial", 'B', 16)
     pdf.cell(0, 10, f"Comprehensive NGO Activity Report", ln=True, align='C')
 
-    # 8. Summary
+    # 5. Summary
     pdf.set_font("Arial", '', 12)
     pdf.ln(10)
-    pdf.cell(0, 10, f"Total Mines found: {int(df_operator['MinesFound'].sum())}", ln=True)
-    pdf.cell(0, 10, f"Average Mines found per Month: {df_operator['MinesFound'].mean():.2f}", ln=True)
-    pdf.cell(0, 10, f"Maximum Mines found in a Month: {df_operator['MinesFound'].max():.2f}", ln=True)
-    pdf.cell(0, 10, f"Minimum Mines found in a Month: {df_operator['MinesFound'].min():.2f}", ln=True)
+    pdf.cell(0, 10, f"Total Mines found: {int(summary['total'])}", ln=True)
+    pdf.cell(0, 10, f"Average Mines found per Month: {summary['mean']:.2f}", ln=True)
+    pdf.cell(0, 10, f"Maximum Mines found in a Month: {summary['max']:.2f}", ln=True)
+    pdf.cell(0, 10, f"Minimum Mines found in a Month: {summary['min']:.2f}", ln=True)
 
-    # 9. Insert Bar Chart
+    # 6. Insert Bar Chart
     pdf.ln(10)
     pdf.set_font("Arial", 'B', 12)
     pdf.cell(0, 10, "Mines Found per Sector", ln=True)
-    pdf.image(str(asset_path / "bar_sector_month.png"), x=10, w=180)
-    
+    _pdf_image(pdf, pngs["bar_sector_month"], x=10, w=180)
+
     pdf.add_page()
     pdf.ln(10)
     pdf.set_font("Arial", 'B', 12)
     pdf.cell(0, 10, "Operator-wise Mines Statistics", ln=True)
-    pdf.image(str(asset_path / "mines_by_operator.png"), x=10, w=180)
+    _pdf_image(pdf, pngs["mines_by_operator"], x=10, w=180)
 
-    # 10. Insert Heatmap
+    # 7. Insert Heatmap
     pdf.add_page()
     pdf.ln(10)
     pdf.set_font("Arial", 'B', 12)
     pdf.cell(0, 10, "TeamLead Operator Assignments", ln=True)
-    pdf.image(str(asset_path / "heatmap_assignments.png"), x=10, w=180)
+    _pdf_image(pdf, pngs["heatmap_assignments"], x=10, w=180)
     try:
-        pdf.output(final_path)
+        body = _pdf_bytes(pdf)
     except Exception as e:
         raise Exception(f"Failed to generate PDF: {e}")
-    return final_path
\ No newline at end of file
+    timings["pdf"] = time.perf_counter() - t3
+    return body
+
+
+def create_pdf(output_path=None, op_path=OPERATOR_XLSX, tl_path=TEAMLEAD_XLSX):
+    """Writes the report to ``output_path`` (assets/ngo_activity_report.pdf by default) and returns the path."""
+    final_path = Path(output_path) if output_path else ASSET_PATH / "ngo_activity_report.pdf"
+    final_path.write_bytes(build_report(op_path, tl_path))
+    return final_path
@@ -0,0 +1,151 @@
+"""
+Background job queue for PDF activity reports.
+
+Reports render in a bounded process pool, so a request never blocks on
+pandas, matplotlib or FPDF. Finished PDFs are stored under a key hashed from
+the source spreadsheets, and a job for inputs that were already rendered
+completes immediately from that file.
+"""
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from atomic_file import atomic_write
+from pdf_report_generator import OPERATOR_XLSX, TEAMLEAD_XLSX, build_report
+
+# Bump when build_report changes the rendered output
+REPORT_FORMAT = 2
+
+DEFAULT_REPORT_DIR = Path(__file__).parent / ".cache" / "reports"
+
+# Jobs kept for status lookups; older finished jobs are forgotten first
+MAX_JOBS = 256
+
+
+def report_key(op_path, tl_path) -> str:
+    """Hex digest of the spreadsheets (and report format) a report is built from."""
+    h = hashlib.sha256(f"format={REPORT_FORMAT}".encode("utf-8"))
+    for path in (op_path, tl_path):
+        with open(path, "rb") as f:
+            h.update(hashlib.sha256(f.read()).digest())
+    return h.hexdigest()[:32]
+
+
+def _render(op_path: str, tl_path: str, out_path: str):
+    """Worker process entry point: renders the report to ``out_path``; returns ``(path, timings)``."""
+    timings = {}
+    body = build_report(op_path, tl_path, timings=timings)
+    atomic_write(out_path, lambda f: f.write(body))
+    return out_path, timings
+
+
+class ReportJobs:
+    """
+    Report jobs by id. Each job is a dict with ``id``, ``key``, ``status``
+    ("pending", "done" or "failed"), ``created_at``, ``finished_at``,
+    ``path``, ``error`` and ``timings`` (seconds per rendering stage, for
+    jobs that rendered).
+    """
+
+    def __init__(self, max_workers: int = 2, report_dir=None,
+                 op_path=OPERATOR_XLSX, tl_path=TEAMLEAD_XLSX):
+        self.max_workers = max_workers
+        self.report_dir = Path(report_dir or os.environ.get("RISK_REPORT_DIR", DEFAULT_REPORT_DIR))
+        self.op_path = Path(op_path)
+        self.tl_path = Path(tl_path)
+        self._jobs = OrderedDict()
+        self._pending = {}  # key -> id of the job rendering it
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def submit(self) -> dict:
+        """
+        Queues a report for the current spreadsheets and returns its job. A
+        report already rendered for the same inputs is returned as done, and
+        one being rendered is shared instead of queued twice.
+        """
+        key = report_key(self.op_path, self.tl_path)
+        path = self.report_dir / f"report-{key}.pdf"
+        with self._lock:
+            if key in self._pending:
+                return dict(self._jobs[self._pending[key]])
+
+            job = {
+                "id": uuid.uuid4().hex,
+                "key": key,
+                "status": "pending",
+                "created_at": time.time(),
+                "finished_at": None,
+                "path": None,
+                "error": None,
+                "timings": None,
+            }
+            self._remember(job)
+            if path.exists():
+                job.update(status="done", finished_at=job["created_at"], path=str(path))
+                return dict(job)
+
+            self.report_dir.mkdir(parents=True, exist_ok=True)
+            if self._executor is None:
+                # spawn: forking a process that runs server threads is unsafe
+                self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+            future = self._executor.submit(_render, str(self.op_path), str(self.tl_path), str(path))
+            self._pending[key] = job["id"]
+        future.add_done_callback(lambda f: self._finish(job["id"], f))
+        return dict(job)
+
+    def get(self, job_id: str):
+        """A copy of the job, or None for an unknown id."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def wait(self, job_id: str, timeout: float = None, poll: float = 0.1):
+        """Blocks until the job is no longer pending (or ``timeout``) and returns it."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] != "pending":
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(poll)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+
+    def _finish(self, job_id: str, future):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            self._pending.pop(job["key"], None)
+            job["finished_at"] = time.time()
+            try:
+                job["path"], job["timings"] = future.result()
+                job["status"] = "done"
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+                if isinstance(e, BrokenProcessPool):
+                    # A worker died; the next job starts a fresh pool
+                    self._executor = None
+                print(f"❌ Report job {job_id} failed: {e}")
+
+    def _remember(self, job: dict):
+        self._jobs[job["id"]] = job
+        while len(self._jobs) > MAX_JOBS:
+            for old_id, old in self._jobs.items():
+                if old["status"] != "pending":
+                    del self._jobs[old_id]
+                    break
+            else:
+                break
@@ -0,0 +1,264 @@
+"""
+Incremental aggregation store for the operator and team-lead spreadsheets.
+
+Monthly rows are ingested into SQLite once per month and the aggregates the
+report needs (mines by sector and month, per-operator statistics and the
+assignment counts) are kept up to date as months arrive. A spreadsheet
+whose bytes have not changed is not read again; a month whose rows changed
+is replaced, and a month that disappeared is removed.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+DEFAULT_STORE_PATH = Path(__file__).parent / ".cache" / "report_store.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    name TEXT PRIMARY KEY,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS months (
+    source TEXT NOT NULL,
+    month TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (source, month)
+);
+CREATE TABLE IF NOT EXISTS operator_rows (
+    month TEXT NOT NULL,
+    sector TEXT NOT NULL,
+    operator TEXT NOT NULL,
+    mines_found REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS operator_rows_month ON operator_rows (month);
+CREATE INDEX IF NOT EXISTS operator_rows_operator ON operator_rows (operator);
+CREATE TABLE IF NOT EXISTS teamlead_rows (
+    month TEXT NOT NULL,
+    operator TEXT NOT NULL,
+    sector_allotted TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS teamlead_rows_month ON teamlead_rows (month);
+CREATE TABLE IF NOT EXISTS mines_by_sector (
+    month TEXT NOT NULL,
+    sector TEXT NOT NULL,
+    mines REAL NOT NULL,
+    PRIMARY KEY (month, sector)
+);
+CREATE TABLE IF NOT EXISTS operator_stats (
+    operator TEXT PRIMARY KEY,
+    n INTEGER NOT NULL,
+    total REAL NOT NULL,
+    min_found REAL NOT NULL,
+    max_found REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS assignments (
+    month TEXT NOT NULL,
+    operator TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    PRIMARY KEY (month, operator)
+);
+"""
+
+
+def _file_digest(path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _rows_digest(rows: pd.DataFrame) -> str:
+    # Numbers as floats, so a NaN elsewhere in the sheet (int -> float) changes nothing
+    numeric = rows.select_dtypes("number").columns
+    rows = rows.astype({c: float for c in numeric})
+    return hashlib.sha256(rows.to_json(orient="values").encode("utf-8")).hexdigest()
+
+
+def read_operator_sheet(path) -> pd.DataFrame:
+    df_operator = pd.read_excel(path, sheet_name=0)  # Sheet has: Month, Sector, Operator, MinesFound
+    df_operator['Month'] = df_operator['Month'].dt.strftime('%Y-%m')
+    df_operator['Sector'] = df_operator['Sector'].astype(str)
+    df_operator['Operator'] = df_operator['Operator'].astype(str)
+    df_operator['MinesFound'] = df_operator['MinesFound'].fillna(0)  # Handle NaN values
+    return df_operator
+
+
+def read_teamlead_sheet(path) -> pd.DataFrame:
+    df_teamlead = pd.read_excel(path, sheet_name=0)  # Sheet has: Month, Operator, SectorAllotted
+    df_teamlead['Month'] = df_teamlead['Month'].dt.strftime('%Y-%m')
+    df_teamlead['Operator'] = df_teamlead['Operator'].astype(str)
+    df_teamlead['SectorAllotted'] = df_teamlead['SectorAllotted'].astype(str)
+    return df_teamlead
+
+
+class ReportStore:
+    """
+    SQLite-backed store of monthly operator/team-lead rows and their
+    aggregates. Safe to share between threads and processes: every ingest
+    runs in one write transaction.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path or os.environ.get("RISK_REPORT_STORE", DEFAULT_STORE_PATH))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as con:
+            con.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL")
+            self._local.con = con
+        return con
+
+    # === Ingestion ===
+
+    def ingest(self, op_path, tl_path) -> dict:
+        """
+        Brings the store up to date with both spreadsheets. Returns the months
+        ``added``, ``replaced`` and ``removed`` per source.
+        """
+        return {
+            "operator": self._ingest_source("operator", op_path, read_operator_sheet, self._apply_operator_month),
+            "teamlead": self._ingest_source("teamlead", tl_path, read_teamlead_sheet, self._apply_teamlead_month),
+        }
+
+    def _ingest_source(self, name, path, read, apply_month) -> dict:
+        changes = {"added": [], "replaced": [], "removed": []}
+        digest = _file_digest(path)
+        con = self._connect()
+        row = con.execute("SELECT digest FROM sources WHERE name = ?", (name,)).fetchone()
+        if row is not None and row[0] == digest:
+            return changes
+
+        df = read(path)
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            known = dict(con.execute("SELECT month, digest FROM months WHERE source = ?", (name,)).fetchall())
+            seen = set()
+            for month, rows in df.groupby('Month', sort=True):
+                seen.add(month)
+                month_digest = _rows_digest(rows)
+                if known.get(month) == month_digest:
+                    continue
+                replaced = month in known
+                apply_month(con, month, rows, replaced)
+                con.execute(
+                    "INSERT INTO months (source, month, digest) VALUES (?, ?, ?) "
+                    "ON CONFLICT (source, month) DO UPDATE SET digest = excluded.digest",
+                    (name, month, month_digest),
+                )
+                changes["replaced" if replaced else "added"].append(month)
+            for month in sorted(set(known) - seen):
+                apply_month(con, month, None, True)
+                con.execute("DELETE FROM months WHERE source = ? AND month = ?", (name, month))
+                changes["removed"].append(month)
+            con.execute(
+                "INSERT INTO sources (name, digest) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET digest = excluded.digest",
+                (name, digest),
+            )
+            con.execute("COMMIT")
+        except BaseException:
+            con.execute("ROLLBACK")
+            raise
+        return changes
+
+    def _apply_operator_month(self, con, month, rows, replaced):
+        """Stores one month of operator rows (None removes it) and updates the aggregates."""
+        affected = set()
+        if replaced:
+            affected = {op for (op,) in con.execute("SELECT DISTINCT operator FROM operator_rows WHERE month = ?", (month,))}
+            con.execute("DELETE FROM operator_rows WHERE month = ?", (month,))
+            con.execute("DELETE FROM mines_by_sector WHERE month = ?", (month,))
+        if rows is not None:
+            con.executemany(
+                "INSERT INTO operator_rows (month, sector, operator, mines_found) VALUES (?, ?, ?, ?)",
+                zip([month] * len(rows), rows['Sector'], rows['Operator'], rows['MinesFound'].astype(float)),
+            )
+            con.execute(
+                "INSERT INTO mines_by_sector (month, sector, mines) "
+                "SELECT month, sector, SUM(mines_found) FROM operator_rows WHERE month = ? GROUP BY sector",
+                (month,),
+            )
+
+        if not replaced:
+            # New month: fold its per-operator stats into the running totals
+            con.execute(
+                "INSERT INTO operator_stats (operator, n, total, min_found, max_found) "
+                "SELECT operator, COUNT(*), SUM(mines_found), MIN(mines_found), MAX(mines_found) "
+                "FROM operator_rows WHERE month = ? GROUP BY operator "
+                "ON CONFLICT (operator) DO UPDATE SET "
+                "n = n + excluded.n, total = total + excluded.total, "
+                "min_found = MIN(min_found, excluded.min_found), max_found = MAX(max_found, excluded.max_found)",
+                (month,),
+            )
+            return
+
+        # Minimum and maximum cannot be retracted, so affected operators are recomputed
+        if rows is not None:
+            affected |= set(rows['Operator'])
+        for operator in affected:
+            con.execute("DELETE FROM operator_stats WHERE operator = ?", (operator,))
+            con.execute(
+                "INSERT INTO operator_stats (operator, n, total, min_found, max_found) "
+                "SELECT operator, COUNT(*), SUM(mines_found), MIN(mines_found), MAX(mines_found) "
+                "FROM operator_rows WHERE operator = ? GROUP BY operator",
+                (operator,),
+            )
+
+    def _apply_teamlead_month(self, con, month, rows, replaced):
+        """Stores one month of team-lead rows (None removes it) and its assignment counts."""
+        if replaced:
+            con.execute("DELETE FROM teamlead_rows WHERE month = ?", (month,))
+            con.execute("DELETE FROM assignments WHERE month = ?", (month,))
+        if rows is None:
+            return
+        con.executemany(
+            "INSERT INTO teamlead_rows (month, operator, sector_allotted) VALUES (?, ?, ?)",
+            zip([month] * len(rows), rows['Operator'], rows['SectorAllotted']),
+        )
+        con.execute(
+            "INSERT INTO assignments (month, operator, n) "
+            "SELECT month, operator, COUNT(*) FROM teamlead_rows WHERE month = ? GROUP BY operator",
+            (month,),
+        )
+
+    # === Aggregates ===
+
+    def mines_by_sector(self) -> pd.DataFrame:
+        """Mines found per month (rows) and sector (columns); NaN where a sector had no rows."""
+        df = pd.read_sql_query("SELECT month AS Month, sector AS Sector, mines FROM mines_by_sector", self._connect())
+        return df.pivot(index='Month', columns='Sector', values='mines').sort_index()
+
+    def operator_stats(self) -> pd.DataFrame:
+        """``sum``, ``mean``, ``min`` and ``max`` of mines found per operator."""
+        df = pd.read_sql_query(
+            "SELECT operator AS Operator, total AS sum, total / n AS mean, min_found AS min, max_found AS max "
+            "FROM operator_stats ORDER BY operator",
+            self._connect(),
+        )
+        return df.set_index('Operator')
+
+    def assignments(self) -> pd.DataFrame:
+        """Team-lead assignment counts per month (rows) and operator (columns)."""
+        df = pd.read_sql_query("SELECT month AS Month, operator AS Operator, n FROM assignments", self._connect())
+        table = df.pivot(index='Month', columns='Operator', values='n').sort_index()
+        return table.fillna(0).astype(int)
+
+    def summary(self) -> dict:
+        """Total, mean, maximum and minimum mines found over all operator rows."""
+        n, total, lo, hi = self._connect().execute(
+            "SELECT SUM(n), SUM(total), MIN(min_found), MAX(max_found) FROM operator_stats"
+        ).fetchone()
+        n = n or 0
+        return {
+            "total": total or 0.0,
+            "mean": total / n if n else float("nan"),
+            "min": lo if lo is not None else float("nan"),
+            "max": hi if hi is not None else float("nan"),
+        }
@@ -0,0 +1,385 @@
+"""
+Compact lattice representation of the partitioned risk grid.
+
+Cells of the grid built by ``map_generator`` are squares on a regular
+lattice, so a RiskGrid keeps only integer lattice indices and NumPy columns
+for risk, partner and leader. Polygons are materialized on demand: interior
+cells are rebuilt from the lattice edges and only cells clipped by the
+Ukraine border keep their own geometry, centroid and area.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import shapely
+
+UNASSIGNED = "Unassigned"
+
+
+class GroupIndex:
+    """
+    Rows grouped by a category code: ``order`` lists rows sorted by code
+    (ascending row order within a code) and ``offsets[c]:offsets[c + 1]``
+    is the slice of ``order`` holding code ``c``.
+    """
+
+    def __init__(self, codes: np.ndarray, num_codes: int):
+        self.order = np.argsort(codes, kind="stable")
+        self.counts = np.bincount(codes, minlength=num_codes)
+        self.offsets = np.zeros(num_codes + 1, dtype=np.int64)
+        np.cumsum(self.counts, out=self.offsets[1:])
+
+    def rows(self, code: int) -> np.ndarray:
+        """Rows with ``code`` as a view into ``order`` (empty for -1)."""
+        if code < 0:
+            return self.order[:0]
+        return self.order[self.offsets[code]:self.offsets[code + 1]]
+
+    def first_rows(self) -> np.ndarray:
+        """First row of every code (-1 where the code has no rows)."""
+        first = np.full(len(self.counts), -1, dtype=np.int64)
+        present = self.counts > 0
+        first[present] = self.order[self.offsets[:-1][present]]
+        return first
+
+
+class RiskGrid:
+    """
+    Risk grid stored as lattice columns.
+
+    - ``resolution``: cell size in degrees
+    - ``x_edges``/``y_edges``: lower edge of every lattice column/row (NaN
+      where no unclipped cell exists); ``origin`` is the lattice corner and
+      ``x_lines``/``y_lines`` the coordinates of all lattice lines
+    - ``i``, ``j``: lattice column and row of each cell (one cell per pair)
+    - ``risk``: float64 risk per cell
+    - ``partner_codes``/``leader_codes``: int16 indices into ``partners`` and
+      ``leaders``
+    - ``clipped_rows``/``clipped_geoms``: rows whose geometry was clipped by
+      the border, with that geometry
+    - ``clipped_centroids``/``clipped_area``: (n, 2) centroid and area of the
+      clipped cells; those of lattice cells follow from the edges
+    - ``by_partner``/``by_leader``: GroupIndex over the codes, built on load
+    """
+
+    def __init__(self, resolution, x_edges, y_edges, i, j, risk, partner_codes, partners,
+                 leader_codes, leaders, clipped_rows, clipped_geoms, crs="EPSG:4326",
+                 clipped_centroids=None, clipped_area=None):
+        self.resolution = float(resolution)
+        self.x_edges = np.asarray(x_edges, dtype=float)
+        self.y_edges = np.asarray(y_edges, dtype=float)
+        self.i = np.asarray(i, dtype=np.int32)
+        self.j = np.asarray(j, dtype=np.int32)
+        self.risk = np.asarray(risk, dtype=float)
+        self.partner_codes = np.asarray(partner_codes, dtype=np.int16)
+        self.partners = np.asarray(partners, dtype=object)
+        self.leader_codes = np.asarray(leader_codes, dtype=np.int16)
+        self.leaders = np.asarray(leaders, dtype=object)
+        self.clipped_rows = np.asarray(clipped_rows, dtype=np.int64)
+        self.clipped_geoms = np.asarray(clipped_geoms, dtype=object)
+        if clipped_centroids is None:
+            clipped_centroids = shapely.get_coordinates(shapely.centroid(self.clipped_geoms))
+        if clipped_area is None:
+            clipped_area = shapely.area(self.clipped_geoms)
+        self.clipped_centroids = np.asarray(clipped_centroids, dtype=float).reshape(-1, 2)
+        self.clipped_area = np.asarray(clipped_area, dtype=float)
+        self.crs = crs
+
+        self.origin = (_first_edge(self.x_edges, self.resolution), _first_edge(self.y_edges, self.resolution))
+        self.x_lines = _lattice_lines(self.x_edges, self.origin[0], self.resolution)
+        self.y_lines = _lattice_lines(self.y_edges, self.origin[1], self.resolution)
+        self._lookup = np.full((len(self.x_edges) + 1, len(self.y_edges) + 1), -1, dtype=np.int32)
+        self._lookup[self.i, self.j] = np.arange(len(self.i), dtype=np.int32)
+        # Plain Python copies for locate_point, which avoids NumPy call overhead
+        self._line_lists = (self.x_lines.tolist(), self.y_lines.tolist())
+        self._clipped_of_row = dict(zip(self.clipped_rows.tolist(), range(len(self.clipped_rows))))
+        self.by_partner = GroupIndex(self.partner_codes, len(self.partners))
+        self.by_leader = GroupIndex(self.leader_codes, len(self.leaders))
+
+    def __len__(self):
+        return len(self.risk)
+
+    @classmethod
+    def from_gdf(cls, gdf: gpd.GeoDataFrame, resolution: float) -> "RiskGrid":
+        """
+        Converts the GeoDataFrame returned by ``_build_gdf``, reusing its
+        ``centroid_x``/``centroid_y``/``area`` columns when present.
+        """
+        geoms = np.asarray(gdf.geometry.values)
+        i = gdf['i'].to_numpy()
+        j = gdf['j'].to_numpy()
+        bounds = shapely.bounds(geoms)
+        full = shapely.box(bounds[:, 0], bounds[:, 1], bounds[:, 0] + resolution, bounds[:, 1] + resolution, ccw=False)
+        # A cell is "unclipped" when the lattice box rebuilds it exactly
+        unclipped = shapely.equals_exact(geoms, full, tolerance=0)
+
+        x_edges = np.full(i.max() + 1 if len(i) else 0, np.nan)
+        y_edges = np.full(j.max() + 1 if len(j) else 0, np.nan)
+        x_edges[i[unclipped]] = bounds[unclipped, 0]
+        y_edges[j[unclipped]] = bounds[unclipped, 1]
+
+        partners, partner_codes = np.unique(gdf['partner'].to_numpy(dtype=object), return_inverse=True)
+        leaders, leader_codes = np.unique(gdf['leader'].to_numpy(dtype=object), return_inverse=True)
+        clipped_rows = np.flatnonzero(~unclipped)
+        clipped_centroids = clipped_area = None
+        if {'centroid_x', 'centroid_y', 'area'}.issubset(gdf.columns):
+            clipped_centroids = gdf[['centroid_x', 'centroid_y']].to_numpy()[clipped_rows]
+            clipped_area = gdf['area'].to_numpy()[clipped_rows]
+        return cls(resolution, x_edges, y_edges, i, j, gdf['risk'].to_numpy(), partner_codes, partners,
+                   leader_codes, leaders, clipped_rows, geoms[clipped_rows], crs=gdf.crs,
+                   clipped_centroids=clipped_centroids, clipped_area=clipped_area)
+
+    # === Column access ===
+
+    @property
+    def partner(self) -> np.ndarray:
+        return self.partners[self.partner_codes]
+
+    @property
+    def leader(self) -> np.ndarray:
+        return self.leaders[self.leader_codes]
+
+    def rows_of(self, column: str, label) -> np.ndarray:
+        """Sorted rows whose partner/leader is ``label``, without copying."""
+        groups = self.by_partner if column == 'partner' else self.by_leader
+        return groups.rows(self.code_of(column, label))
+
+    def code_of(self, column: str, label) -> int:
+        """Code of ``label`` in the partner/leader categories, or -1."""
+        categories = self.partners if column == 'partner' else self.leaders
+        hits = np.flatnonzero(categories == label)
+        return int(hits[0]) if len(hits) else -1
+
+    # === Geometry ===
+
+    def _clipped_positions(self, rows: np.ndarray):
+        """Mask of the clipped ``rows`` and their positions in the clipped arrays."""
+        pos = np.minimum(np.searchsorted(self.clipped_rows, rows), max(len(self.clipped_rows) - 1, 0))
+        clipped = self.clipped_rows[pos] == rows if len(self.clipped_rows) else np.zeros(len(rows), dtype=bool)
+        return clipped, pos[clipped]
+
+    def geometry(self, rows=None) -> np.ndarray:
+        """Shapely polygons for ``rows`` (all cells if None)."""
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        geoms = np.empty(len(rows), dtype=object)
+        clipped, pos = self._clipped_positions(rows)
+        geoms[clipped] = self.clipped_geoms[pos]
+
+        inner = ~clipped
+        x0 = self.x_edges[self.i[rows[inner]]]
+        y0 = self.y_edges[self.j[rows[inner]]]
+        # GEOS emits unclipped cells clockwise; keep that vertex order
+        geoms[inner] = shapely.box(x0, y0, x0 + self.resolution, y0 + self.resolution, ccw=False)
+        return geoms
+
+    def centroids(self, rows=None) -> np.ndarray:
+        """(n, 2) float64 centroid x/y of ``rows`` (all cells if None)."""
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        xy = np.empty((len(rows), 2))
+        clipped, pos = self._clipped_positions(rows)
+        xy[clipped] = self.clipped_centroids[pos]
+
+        inner = ~clipped
+        x0 = self.x_edges[self.i[rows[inner]]]
+        y0 = self.y_edges[self.j[rows[inner]]]
+        xy[inner, 0] = (x0 + (x0 + self.resolution)) / 2
+        xy[inner, 1] = (y0 + (y0 + self.resolution)) / 2
+        return xy
+
+    def area(self, rows=None) -> np.ndarray:
+        """Float64 area of ``rows`` (all cells if None), in square degrees."""
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        area = np.full(len(rows), self.resolution * self.resolution)
+        clipped, pos = self._clipped_positions(rows)
+        area[clipped] = self.clipped_area[pos]
+        return area
+
+    def rows_in_bbox(self, bbox) -> np.ndarray:
+        """Sorted rows of cells intersecting the lon/lat ``bbox``."""
+        minx, miny, maxx, maxy = bbox
+        ox, oy = self.origin
+        r = self.resolution
+        nx, ny = len(self.x_edges), len(self.y_edges)
+        # One cell of slack absorbs floating-point drift in the lattice edges
+        i0 = max(int(np.floor((minx - ox) / r)) - 1, 0)
+        i1 = min(int(np.floor((maxx - ox) / r)) + 1, nx - 1)
+        j0 = max(int(np.floor((miny - oy) / r)) - 1, 0)
+        j1 = min(int(np.floor((maxy - oy) / r)) + 1, ny - 1)
+        if i0 > i1 or j0 > j1:
+            return np.zeros(0, dtype=np.int64)
+
+        rows = self._lookup[i0:i1 + 1, j0:j1 + 1].ravel()
+        rows = np.sort(rows[rows >= 0]).astype(np.int64)
+        hit = shapely.intersects(self.geometry(rows), shapely.box(minx, miny, maxx, maxy))
+        return rows[hit]
+
+    def locate(self, x, y) -> np.ndarray:
+        """
+        Row of the cell containing each lon/lat point (``x``, ``y``), or -1.
+        Points are placed on the lattice arithmetically; only those landing
+        in the lattice square of a clipped cell are tested against its
+        geometry.
+        """
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        i = _lattice_index(x, self.x_lines, self.origin[0], self.resolution)
+        j = _lattice_index(y, self.y_lines, self.origin[1], self.resolution)
+        rows = np.full(x.shape, -1, dtype=np.int64)
+        inside = (i >= 0) & (j >= 0)
+        rows[inside] = self._lookup[i[inside], j[inside]]
+
+        found = np.flatnonzero(rows >= 0)
+        clipped, pos = self._clipped_positions(rows[found])
+        if len(pos):
+            tested = found[clipped]
+            rows[tested[~shapely.intersects_xy(self.clipped_geoms[pos], x[tested], y[tested])]] = -1
+        return rows
+
+    def lattice_square(self, x: float, y: float):
+        """Lattice ``(i, j)`` of the square holding a single point, whether or not it has a cell; -1 outside."""
+        return (_line_index(x, self._line_lists[0], self.origin[0], self.resolution),
+                _line_index(y, self._line_lists[1], self.origin[1], self.resolution))
+
+    def locate_point(self, x: float, y: float) -> int:
+        """``locate`` for a single point, in plain Python."""
+        i, j = self.lattice_square(x, y)
+        if i < 0 or j < 0:
+            return -1
+        row = int(self._lookup[i, j])
+        pos = self._clipped_of_row.get(row)
+        if pos is not None and not shapely.intersects_xy(self.clipped_geoms[pos], x, y):
+            return -1
+        return row
+
+    def to_gdf(self, rows=None, columns=('geometry', 'risk', 'partner', 'leader')) -> gpd.GeoDataFrame:
+        """
+        GeoDataFrame of ``rows`` (all cells if None) indexed by row, with the
+        requested columns in order. Besides the stored columns,
+        ``centroid_x``, ``centroid_y`` and ``area`` are available.
+        """
+        rows = np.arange(len(self)) if rows is None else np.asarray(rows, dtype=np.int64)
+        if 'geometry' not in columns:
+            columns = tuple(columns) + ('geometry',)
+        data = {}
+        xy = None
+        for column in columns:
+            if column in ('centroid_x', 'centroid_y'):
+                if xy is None:
+                    xy = self.centroids(rows)
+                data[column] = xy[:, 0 if column == 'centroid_x' else 1]
+            elif column == 'area':
+                data[column] = self.area(rows)
+            elif column == 'geometry':
+                data[column] = gpd.array.from_shapely(self.geometry(rows), crs=self.crs)
+            elif column == 'partner':
+                data[column] = self.partners[self.partner_codes[rows]]
+            elif column == 'leader':
+                data[column] = self.leaders[self.leader_codes[rows]]
+            else:
+                data[column] = getattr(self, column)[rows]
+        return gpd.GeoDataFrame(data, index=pd.Index(rows), geometry='geometry', crs=self.crs)
+
+    # === Persistence ===
+
+    def save(self, file):
+        """Writes the grid as an uncompressed ``.npz`` to a path or a binary file object."""
+        if not hasattr(file, "write"):
+            with open(file, "wb") as f:
+                return self.save(f)
+        wkb = shapely.to_wkb(self.clipped_geoms) if len(self.clipped_geoms) else np.zeros(0, dtype=object)
+        wkb_offsets = np.zeros(len(wkb) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in wkb], out=wkb_offsets[1:])
+        wkb_blob = np.frombuffer(b"".join(wkb), dtype=np.uint8)
+        crs = self.crs.to_string() if hasattr(self.crs, "to_string") else str(self.crs)
+        np.savez(
+            file,
+            resolution=np.array(self.resolution),
+            x_edges=self.x_edges,
+            y_edges=self.y_edges,
+            i=self.i,
+            j=self.j,
+            risk=self.risk,
+            partner_codes=self.partner_codes,
+            partners=self.partners.astype(str),
+            leader_codes=self.leader_codes,
+            leaders=self.leaders.astype(str),
+            clipped_rows=self.clipped_rows,
+            clipped_wkb=wkb_blob,
+            clipped_wkb_offsets=wkb_offsets,
+            clipped_centroids=self.clipped_centroids,
+            clipped_area=self.clipped_area,
+            crs=np.array(crs),
+        )
+
+    @classmethod
+    def load(cls, path) -> "RiskGrid":
+        with np.load(path, allow_pickle=False) as data:
+            blob = data["clipped_wkb"].tobytes()
+            offsets = data["clipped_wkb_offsets"]
+            wkb = [blob[offsets[k]:offsets[k + 1]] for k in range(len(offsets) - 1)]
+            clipped_geoms = shapely.from_wkb(np.array(wkb, dtype=object)) if wkb else np.zeros(0, dtype=object)
+            return cls(
+                data["resolution"].item(),
+                data["x_edges"],
+                data["y_edges"],
+                data["i"],
+                data["j"],
+                data["risk"],
+                data["partner_codes"],
+                data["partners"].astype(object),
+                data["leader_codes"],
+                data["leaders"].astype(object),
+                data["clipped_rows"],
+                clipped_geoms,
+                crs=str(data["crs"]),
+                clipped_centroids=data["clipped_centroids"],
+                clipped_area=data["clipped_area"],
+            )
+
+
+def _first_edge(edges: np.ndarray, resolution: float) -> float:
+    """Lattice origin implied by the first known edge."""
+    known = np.flatnonzero(~np.isnan(edges))
+    if len(known) == 0:
+        return 0.0
+    return float(edges[known[0]] - known[0] * resolution)
+
+
+def _lattice_lines(edges: np.ndarray, origin: float, resolution: float) -> np.ndarray:
+    """
+    Coordinates of the ``len(edges) + 1`` lattice lines: the known lower cell
+    edges, and the previous line plus ``resolution`` elsewhere (matching
+    how ``map_generator`` accumulates them).
+    """
+    lines = np.empty(len(edges) + 1)
+    previous = origin - resolution
+    for k in range(len(lines)):
+        previous = edges[k] if k < len(edges) and not np.isnan(edges[k]) else previous + resolution
+        lines[k] = previous
+    return lines
+
+
+def _lattice_index(v: np.ndarray, lines: np.ndarray, origin: float, resolution: float) -> np.ndarray:
+    """Lattice column (or row) holding each coordinate in ``v``, half-open on the right; -1 outside."""
+    n = len(lines) - 1
+    if n < 1:
+        return np.full(v.shape, -1, dtype=np.int64)
+    k = np.clip(np.nan_to_num(np.floor((v - origin) / resolution)), 0, n - 1).astype(np.int64)
+    # The arithmetic guess can be one off where the lines drift from origin + k * resolution
+    k -= (v < lines[k]) & (k > 0)
+    k += (v >= lines[k + 1]) & (k < n - 1)
+    return np.where((v >= lines[0]) & (v < lines[-1]), k, -1)
+
+
+def _line_index(v: float, lines: list, origin: float, resolution: float) -> int:
+    """Scalar ``_lattice_index`` over ``lines`` as a list."""
+    if not lines[0] <= v < lines[-1]:
+        return -1
+    n = len(lines) - 1
+    k = min(max(math.floor((v - origin) / resolution), 0), n - 1)
+    if v < lines[k] and k > 0:
+        k -= 1
+    elif v >= lines[k + 1] and k < n - 1:
+        k += 1
+    return k
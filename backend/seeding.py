@@ -0,0 +1,53 @@
+"""
+Farthest-point seeding for the partner and leader flood fills.
+
+Keeps one running min-distance array over all cells and updates it with a
+single NumPy pass after each new seed, so picking ``k`` seeds costs O(n·k).
+For very large grids the ``kdtree`` method restricts each update to the
+cells within the current maximum distance of the new seed.
+"""
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+def farthest_point_seeds(xy, num_seeds: int, first: int = 0, method: str = "numpy", prefer: str = "first") -> list:
+    """
+    Picks up to ``num_seeds`` row positions of ``xy`` (an (n, 2) array of
+    coordinates), starting from ``first`` and then repeatedly taking the
+    point farthest from all seeds chosen so far.
+
+    ``method`` is "numpy" (dense update) or "kdtree". Ties are broken by
+    taking the lowest (``prefer="first"``) or highest (``prefer="last"``) row.
+    """
+    if method not in ("numpy", "kdtree"):
+        raise ValueError(f"Unknown seeding method: {method}")
+    if prefer not in ("first", "last"):
+        raise ValueError(f"Unknown tie-break: {prefer}")
+
+    xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+    n = len(xy)
+    if n == 0 or num_seeds <= 0:
+        return []
+
+    tree = cKDTree(xy) if method == "kdtree" else None
+    min_dist = np.full(n, np.inf)
+    chosen = [int(first)]
+    while len(chosen) < min(num_seeds, n):
+        seed = xy[chosen[-1]]
+        if tree is None or len(chosen) == 1:
+            rows = slice(None)
+        else:
+            # Only cells closer to the new seed than the current maximum can change
+            radius = min_dist.max() * (1 + 1e-9)
+            rows = np.asarray(tree.query_ball_point(seed, radius), dtype=np.int64)
+        delta = xy[rows] - seed
+        dist = np.sqrt(delta[:, 0] * delta[:, 0] + delta[:, 1] * delta[:, 1])
+        min_dist[rows] = np.minimum(min_dist[rows], dist)
+        min_dist[chosen[-1]] = -np.inf
+
+        if prefer == "first":
+            best = int(np.argmax(min_dist))
+        else:
+            best = n - 1 - int(np.argmax(min_dist[::-1]))
+        chosen.append(best)
+    return chosen
@@ -1,27 +1,73 @@
 import os
 import io
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, Response, FileResponse
+from fastapi.responses import StreamingResponse, Response, FileResponse, JSONResponse
 import json
-from pdf_report_generator import create_pdf
-from map_generator import generate_risk_map, generate_risk_map_for_partner, _build_gdf
+import numpy as np
+import pydantic_core
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
+from report_jobs import ReportJobs
+from map_generator import generate_risk_map, generate_risk_map_for_partner
+from dataset import Dataset, DatasetManager
+from response_cache import conditional_response, make_payload
+from grid_query import block_factor, parse_bbox
+from exports import ARROW_MEDIA_TYPE, PARQUET_MEDIA_TYPE, to_arrow_ipc, to_geoparquet
+from tiles import MAX_ZOOM, MVT_MEDIA_TYPE, mapbox_vector_tile
+from outlines import LEVELS as OUTLINE_LEVELS
+from danger import DEFAULT_THRESHOLDS as DEFAULT_DANGER_THRESHOLDS
+from grid_cache import DEFAULT_CACHE_DIR
+from topojson import DEFAULT_PRECISION, MAX_PRECISION, MIN_PRECISION, to_topojson
 
 app = FastAPI()
 
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],
-    allow_methods=["GET"],
+    allow_methods=["GET", "POST"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
 UA_JSON = os.path.join(os.path.dirname(__file__), "ua.json")
+RISK_MAP_SEED = int(os.environ.get("RISK_MAP_SEED", "42"))
+# Seconds between checks of ua.json for changes (0 disables the watcher)
+RISK_MAP_WATCH_SECONDS = float(os.environ.get("RISK_MAP_WATCH_SECONDS", "5"))
+# When set, POST /admin/rebuild requires this value in the X-Admin-Token header
+RISK_MAP_ADMIN_TOKEN = os.environ.get("RISK_MAP_ADMIN_TOKEN")
+# Most points one POST /risk/at/batch may look up
+RISK_AT_MAX_POINTS = int(os.environ.get("RISK_AT_MAX_POINTS", "250000"))
+# Comma-separated risk thresholds served by /risk/nearest-danger
+RISK_MAP_DANGER_THRESHOLDS = tuple(
+    float(t) for t in os.environ.get("RISK_MAP_DANGER_THRESHOLDS", ",".join(map(str, DEFAULT_DANGER_THRESHOLDS))).split(",")
+)
+# When set, nearest-danger tables are written to the grid cache directory and memory-mapped
+RISK_MAP_DANGER_MMAP = bool(os.environ.get("RISK_MAP_DANGER_MMAP"))
 
 # Cache full map and per-partner maps at startup
 _cached_full = None
 _cached_partner = {}
-_cached_gdf = None
+
+def _on_dataset_swap(dataset: Dataset):
+    # Zone outlines are small and read by every map page; dissolve them up front
+    for level in OUTLINE_LEVELS:
+        dataset.outlines(level)
+    dataset.danger_field()
+    if os.environ.get("RISK_MAP_PRESEED_TILES") and mapbox_vector_tile is not None:
+        print("📍 Pre-seeding Kharkiv vector tiles...")
+        print(f"✅ {dataset.tile_set().seed()} tiles cached")
+
+# The risk grid being served, with its derived caches; rebuilt in the background
+_datasets = DatasetManager(
+    UA_JSON, RISK_MAP_SEED, on_swap=_on_dataset_swap,
+    danger_thresholds=RISK_MAP_DANGER_THRESHOLDS,
+    danger_cache_dir=os.environ.get("RISK_MAP_CACHE_DIR", DEFAULT_CACHE_DIR) if RISK_MAP_DANGER_MMAP else None,
+)
+
+# PDF activity reports, rendered in a bounded worker pool
+_reports = ReportJobs(max_workers=int(os.environ.get("RISK_REPORT_WORKERS", "2")))
 
 print("🚀 Starting server...")
 try:
@@ -36,10 +82,13 @@ try:
     # }
     # print("✅ Partner maps cached")
     
-    # Cache GeoDataFrame for GeoJSON endpoints
-    print("📍 Building GeoDataFrame...")
-    _cached_gdf = _build_gdf(UA_JSON)
-    print("✅ GeoDataFrame cached")
+    # Serve the cached risk grid right away; build it in the background otherwise
+    print("📍 Loading risk grid...")
+    if not _datasets.load_cached():
+        print("📍 No cached risk grid, building in the background...")
+        _datasets.rebuild()
+    if RISK_MAP_WATCH_SECONDS > 0:
+        _datasets.watch(RISK_MAP_WATCH_SECONDS)
     
     print(f"🗺️  Cached endpoints ready: "
           f"http://localhost:8000/risk-map/png  "
@@ -73,139 +122,464 @@ except Exception as e:
 #     # Returning as plain Response avoids potential hanging of StreamingResponse
 #     return Response(content=_cached_full, media_type="image/png")
 
+def _to_geojson_bytes(gdf) -> bytes:
+    return gdf.to_json(separators=(",", ":")).encode("utf-8")
+
+# Shared query parameters of the endpoints that can answer in TopoJSON
+FORMAT_QUERY = Query("geojson", regex="^(geojson|topojson)$")
+PRECISION_QUERY = Query(None, ge=MIN_PRECISION, le=MAX_PRECISION,
+                        description="TopoJSON quantization: 10**precision positions per axis "
+                                    f"(default {DEFAULT_PRECISION}; any value is raised until no polygon collapses)")
+
+def _encode(frames: dict, fmt: str, precision: int) -> bytes:
+    """
+    ``{name: GeoDataFrame}`` as one TopoJSON topology with an object per
+    name, or for GeoJSON the single frame's FeatureCollection.
+    """
+    if fmt == "topojson":
+        return to_topojson(frames, precision)
+    (gdf,) = frames.values()
+    return _to_geojson_bytes(gdf)
+
+def _format_key(fmt: str, precision: int) -> tuple:
+    """Cache key suffix for the output format (empty for GeoJSON)."""
+    return (fmt, precision) if fmt == "topojson" else ()
+
+def _current_dataset() -> Dataset:
+    """The dataset to serve this request from; 503 until the first build finishes."""
+    dataset = _datasets.current
+    if dataset is None:
+        raise HTTPException(503, "Risk grid not ready", headers={"Retry-After": "5"})
+    return dataset
+
+def _cached_json_response(request: Request, dataset: Dataset, key, render):
+    """
+    Serves the bytes rendered for ``key`` under ``dataset``'s version,
+    rendering them on first use. Honours If-None-Match and Accept-Encoding.
+    """
+    payload = dataset.responses.get(dataset.version, key, render)
+    return conditional_response(request, payload, "application/json")
+
 @app.get("/risk-map/geojson")
-def get_risk_map_geojson(partner: str = Query(None, regex="^[ABC]$")):
+def get_risk_map_geojson(
+    request: Request,
+    partner: str = Query(None, regex="^[ABC]$"),
+    bbox: str = Query(None, description="minx,miny,maxx,maxy in EPSG:4326"),
+    min_risk: float = Query(None, ge=0, le=1),
+    zoom: int = Query(None, ge=0, le=22),
+    format: str = FORMAT_QUERY,
+    precision: int = PRECISION_QUERY,
+):
     """
     Returns GeoJSON data for the specified partner's region or all regions.
+
+    ``bbox`` limits the result to cells intersecting the viewport,
+    ``min_risk`` drops cells below that risk and ``zoom`` merges cells into
+    coarser blocks (with a ``cells`` count) below full-detail zoom levels.
+    ``format=topojson`` returns the same features as the "cells" object of a
+    TopoJSON topology quantized to at least ``precision`` digits.
     """
-    if _cached_gdf is None:
-        raise HTTPException(500, "GeoDataFrame not available")
-    
-    gdf = _cached_gdf.copy()
+    dataset = _current_dataset()
     
+    try:
+        bounds = parse_bbox(bbox) if bbox else None
+    except ValueError as e:
+        raise HTTPException(400, f"Invalid bbox: {e}")
+
     # Drop columns that aren't JSON serializable
     columns_to_keep = ['geometry', 'risk', 'partner']
-    gdf_clean = gdf[columns_to_keep]
-    
+    factor = block_factor(zoom)
+    index = dataset.grid_index()
+
+    def render():
+        rows = index.select(bounds, partner, min_risk)
+        return _encode({"cells": index.frame(rows, columns_to_keep, factor)}, format, precision)
+
+    if bounds is not None or min_risk is not None:
+        # Viewport queries are too varied to keep; only the bytes are built here
+        payload = make_payload(dataset.version, render())
+        return conditional_response(request, payload, "application/json")
+
     if partner:
         # Filter for specific partner
-        partner_gdf = gdf_clean[gdf_clean['partner'] == partner]
-        if partner_gdf.empty:
-            raise HTTPException(404, f"No data for partner {partner}")
-        return json.loads(partner_gdf.to_json())
-    else:
-        # Return all partner data
-        assigned_gdf = gdf_clean[gdf_clean['partner'] != 'Unassigned']
-        return json.loads(assigned_gdf.to_json())
+        def render():
+            rows = index.select(partner=partner)
+            if len(rows) == 0:
+                raise HTTPException(404, f"No data for partner {partner}")
+            return _encode({"cells": index.frame(rows, columns_to_keep, factor)}, format, precision)
+    return _cached_json_response(request, dataset, ("geojson", partner, factor) + _format_key(format, precision), render)
 
 @app.get("/risk-map/geojson/all-risk")
-def get_all_risk_geojson():
+def get_all_risk_geojson(request: Request, format: str = FORMAT_QUERY, precision: int = PRECISION_QUERY):
     """
     Returns GeoJSON data for all assigned areas with risk information for risk-proportional visualization.
-    Excludes unassigned areas.
+    Excludes unassigned areas. ``format=topojson`` returns them as the "cells" object of a TopoJSON topology.
     """
-    if _cached_gdf is None:
-        raise HTTPException(500, "GeoDataFrame not available")
+    dataset = _current_dataset()
     
-    try:
-        # Get only assigned data (exclude unassigned areas)
-        gdf = _cached_gdf.copy()
-        assigned_gdf = gdf[gdf['partner'] != 'Unassigned']
-        
-        # Keep all necessary columns for risk visualization
+    def render():
+        # Keep all necessary columns for risk visualization, only assigned areas
         columns_to_keep = ['geometry', 'risk', 'partner', 'leader']
-        gdf_clean = assigned_gdf[columns_to_keep]
-        
-        # Convert to GeoJSON
-        return json.loads(gdf_clean.to_json())
+        assigned_rows = dataset.grid_index().select()
+        return _encode({"cells": dataset.grid.to_gdf(assigned_rows, columns_to_keep)}, format, precision)
+
+    try:
+        return _cached_json_response(request, dataset, ("all-risk",) + _format_key(format, precision), render)
     except Exception as e:
         raise HTTPException(500, f"Error processing risk data: {str(e)}")
 
+def _export_response(request: Request, fmt: str, partner, leader, geometry_encoding: str):
+    """
+    Serves the grid (optionally one partner's or leader's cells) as Arrow IPC
+    or GeoParquet bytes cached per dataset version.
+    """
+    dataset = _current_dataset()
+    grid = dataset.grid
+
+    def render():
+        rows = dataset.grid_index().select(partner=partner)
+        if leader:
+            rows = rows[grid.leader_codes[rows] == grid.code_of('leader', leader)]
+        if len(rows) == 0:
+            raise HTTPException(404, "No data for the requested partner/leader")
+        columns_to_keep = ['geometry', 'risk', 'partner', 'leader', 'centroid_x', 'centroid_y', 'area']
+        gdf = grid.to_gdf(rows, columns_to_keep)
+        writer = to_arrow_ipc if fmt == "arrow" else to_geoparquet
+        return writer(gdf, geometry_encoding)
+
+    payload = dataset.responses.get(dataset.version, (fmt, partner, leader, geometry_encoding), render)
+    media_type = ARROW_MEDIA_TYPE if fmt == "arrow" else PARQUET_MEDIA_TYPE
+    # Both formats are zstd-compressed internally
+    response = conditional_response(request, payload, media_type, compress=False)
+    response.headers["Content-Disposition"] = f'attachment; filename="risk-map.{fmt}"'
+    return response
+
+@app.get("/risk-map/arrow")
+def get_risk_map_arrow(
+    request: Request,
+    partner: str = Query(None, regex="^[ABC]$"),
+    leader: str = Query(None, regex="^[A-Za-z0-9_-]+$"),
+    geometry_encoding: str = Query("wkb", regex="^(wkb|geoarrow)$"),
+):
+    """
+    Returns the assigned cells as an Arrow IPC file with geometry, risk,
+    partner, leader, centroid_x, centroid_y and area columns.
+    """
+    return _export_response(request, "arrow", partner, leader, geometry_encoding)
+
+@app.get("/risk-map/parquet")
+def get_risk_map_parquet(
+    request: Request,
+    partner: str = Query(None, regex="^[ABC]$"),
+    leader: str = Query(None, regex="^[A-Za-z0-9_-]+$"),
+    geometry_encoding: str = Query("wkb", regex="^(wkb|geoarrow)$"),
+):
+    """
+    Returns the assigned cells as GeoParquet with geometry, risk, partner,
+    leader, centroid_x, centroid_y and area columns.
+    """
+    return _export_response(request, "parquet", partner, leader, geometry_encoding)
+
+@app.get("/tiles/{z}/{x}/{y}.mvt")
+def get_risk_tile(request: Request, z: int, x: int, y: int):
+    """
+    Returns a Mapbox Vector Tile with a "risk" layer carrying the risk,
+    partner and leader of every cell in the tile.
+    """
+    dataset = _current_dataset()
+    if mapbox_vector_tile is None:
+        raise HTTPException(501, "Vector tiles need the mapbox_vector_tile package")
+    if not (0 <= z <= MAX_ZOOM and 0 <= x < (1 << z) and 0 <= y < (1 << z)):
+        raise HTTPException(404, f"No tile {z}/{x}/{y}")
+
+    payload = dataset.tile_set().get(z, x, y)
+    return conditional_response(request, payload, MVT_MEDIA_TYPE)
+
 @app.get("/health")
 def health_check():
-    """Simple health check endpoint"""
-    return {"status": "healthy", "cached_full": _cached_full is not None, "cached_partners": list(_cached_partner.keys())}
+    """
+    Health check endpoint. ``status`` is "starting" until the first risk
+    grid is ready; ``dataset`` reports the served version and rebuild state.
+    """
+    dataset_status = _datasets.status()
+    dataset = _datasets.current
+    grid_cache = None
+    if dataset is not None:
+        grid_cache = {
+            "hit": dataset.info["hit"],
+            "key": dataset.info["key"],
+            "load_ms": round(dataset.info["load_seconds"] * 1000, 1),
+        }
+    return {
+        "status": "healthy" if dataset_status["ready"] else "starting",
+        "cached_full": _cached_full is not None,
+        "cached_partners": list(_cached_partner.keys()),
+        "grid_cache": grid_cache,
+        "dataset": dataset_status,
+    }
+
+@app.post("/admin/rebuild", status_code=202)
+def rebuild_dataset(request: Request):
+    """
+    Starts a background rebuild of the risk grid. The current version keeps
+    serving until the new one is swapped in; poll /health for progress.
+    """
+    if RISK_MAP_ADMIN_TOKEN and request.headers.get("x-admin-token") != RISK_MAP_ADMIN_TOKEN:
+        raise HTTPException(403, "Invalid admin token")
+    _datasets.rebuild()
+    return _datasets.status()
 
-def get_gdfs_by_leader():
+def get_gdfs_by_leader(dataset: Dataset = None):
     """
-    Reads the _cached_gdf and outputs a dictionary keyed by 'leader' 
+    Reads the current dataset's risk grid (or ``dataset``'s) and outputs a dictionary keyed by 'leader' 
     with corresponding GeoDataFrames as values.
     
     Returns:
         dict: Dictionary where keys are leader names (e.g., 'A1', 'A2', 'B1', etc.)
               and values are GeoDataFrames containing only the rows for that leader.
     """
-    if _cached_gdf is None:
-        raise ValueError("GeoDataFrame not available - server not properly initialized")
-    
-    # Get unique leader values (excluding 'Unassigned' if desired)
-    unique_leaders = _cached_gdf['leader'].unique()
+    dataset = dataset or _datasets.current
+    if dataset is None:
+        raise ValueError("Risk grid not available - server not properly initialized")
     
-    # Create dictionary with leader as key and filtered GDF as value
-    leader_gdfs = {}
-    
-    for leader in unique_leaders:
-        # Filter the GDF for this specific leader
-        leader_gdf = _cached_gdf[_cached_gdf['leader'] == leader].copy()
-        
-        # Only add to dictionary if the leader has assigned areas and has a partner
-        if not leader_gdf.empty and leader != "Unassigned":
-            # Check if any rows have a valid partner (not 'Unassigned')
-            partner_rows = leader_gdf[leader_gdf['partner'] != 'Unassigned']
-            if not partner_rows.empty:
-                leader_gdfs[leader] = leader_gdf
-    
-    return leader_gdfs
+    # Slices of the leader group index are views, so only the output frames are built
+    grid = dataset.grid
+    return {
+        grid.leaders[code]: grid.to_gdf(grid.by_leader.rows(code))
+        for code in _assigned_leader_codes(grid)
+    }
+
+def _assigned_leader_codes(grid):
+    """
+    Codes of leaders (other than 'Unassigned') with at least one cell that has
+    a partner, in order of first appearance in the grid.
+    """
+    assigned = grid.partner_codes != grid.code_of('partner', 'Unassigned')
+    keep = np.bincount(grid.leader_codes[assigned], minlength=len(grid.leaders)) > 0
+    keep &= grid.leaders != 'Unassigned'
+    codes = np.flatnonzero(keep)
+    return codes[np.argsort(grid.by_leader.first_rows()[codes])]
 
 @app.get("/risk-map/geojson/leaders")
-def get_risk_map_geojson_by_leaders():
+def get_risk_map_geojson_by_leaders(request: Request, format: str = FORMAT_QUERY, precision: int = PRECISION_QUERY):
     """
-    Returns GeoJSON data grouped by leader.
+    Returns GeoJSON data grouped by leader. ``format=topojson`` returns one
+    TopoJSON topology with an object per leader, so sides shared by two
+    leaders' cells are written once.
     """
-    if _cached_gdf is None:
-        raise HTTPException(500, "GeoDataFrame not available")
+    dataset = _current_dataset()
     
-    try:
-        leader_gdfs = get_gdfs_by_leader()
+    def render():
+        leader_gdfs = get_gdfs_by_leader(dataset)
         
-        # Convert each leader's GDF to GeoJSON
-        leaders_geojson = {}
-        for leader, gdf in leader_gdfs.items():
-            # Drop columns that aren't JSON serializable, but keep leader and partner info
-            columns_to_keep = ['geometry', 'risk', 'partner', 'leader']
-            gdf_clean = gdf[columns_to_keep]
-            leaders_geojson[leader] = json.loads(gdf_clean.to_json())
-        
-        return leaders_geojson
+        columns_to_keep = ['geometry', 'risk', 'partner', 'leader']
+        if format == "topojson":
+            return to_topojson({leader: gdf[columns_to_keep] for leader, gdf in leader_gdfs.items()}, precision)
+        # Splice each leader's GeoJSON into one object keyed by leader
+        parts = [
+            json.dumps(leader).encode("utf-8") + b":" + _to_geojson_bytes(gdf[columns_to_keep])
+            for leader, gdf in leader_gdfs.items()
+        ]
+        return b"{" + b",".join(parts) + b"}"
+
+    try:
+        return _cached_json_response(request, dataset, ("leaders",) + _format_key(format, precision), render)
     except Exception as e:
         raise HTTPException(500, f"Error processing leader data: {str(e)}")
 
+@app.get("/risk-map/outlines")
+def get_risk_map_outlines(
+    request: Request,
+    level: str = Query("leader", regex="^(leader|partner)$"),
+    format: str = FORMAT_QUERY,
+    precision: int = PRECISION_QUERY,
+):
+    """
+    Returns one dissolved (Multi)Polygon feature per team leader or partner
+    with ``num_cells``, ``total_risk`` and ``avg_risk`` (and ``partner`` for
+    leaders), for drawing zone overlays without the individual cells.
+    ``format=topojson`` returns them as the ``level`` object of a TopoJSON
+    topology, with borders between neighbouring zones written once.
+    """
+    dataset = _current_dataset()
+
+    def render():
+        return _encode({level: dataset.outlines(level)}, format, precision)
+
+    try:
+        return _cached_json_response(request, dataset, ("outlines", level) + _format_key(format, precision), render)
+    except Exception as e:
+        raise HTTPException(500, f"Error processing outline data: {str(e)}")
+
 @app.get("/leaders")
-def get_leaders_info():
+def get_leaders_info(request: Request):
     """
     Returns information about all leaders and their assigned areas.
     """
-    try:
-        leader_gdfs = get_gdfs_by_leader()
-        
+    dataset = _current_dataset()
+
+    def render():
+        # One pass over the leader codes gives every leader's count and total
+        grid = dataset.grid
+        counts = grid.by_leader.counts
+        totals = np.bincount(grid.leader_codes, weights=grid.risk, minlength=len(grid.leaders))
+        first_rows = grid.by_leader.first_rows()
+
         # Create summary information for each leader
         leaders_info = {}
-        for leader, gdf in leader_gdfs.items():
-            leaders_info[leader] = {
-                "num_cells": len(gdf),
-                "total_risk": float(gdf['risk'].sum()),
-                "avg_risk": float(gdf['risk'].mean()),
-                "partner": gdf['partner'].iloc[0] if len(gdf) > 0 else None
+        for code in _assigned_leader_codes(grid):
+            leaders_info[grid.leaders[code]] = {
+                "num_cells": int(counts[code]),
+                "total_risk": float(totals[code]),
+                "avg_risk": float(totals[code] / counts[code]),
+                "partner": grid.partners[grid.partner_codes[first_rows[code]]],
             }
-        
-        return {
+        content = {
             "leaders": leaders_info,
             "total_leaders": len(leaders_info)
         }
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+    try:
+        return _cached_json_response(request, dataset, ("leaders-info",), render)
     except Exception as e:
         raise HTTPException(500, f"Error processing leader data: {str(e)}")
 
+@app.get("/risk/at")
+def get_risk_at(lat: float = Query(..., ge=-90, le=90), lon: float = Query(..., ge=-180, le=180)):
+    """
+    Returns the risk, partner and leader of the cell containing the point
+    ``lat``/``lon``; 404 when the point is outside the grid.
+    """
+    grid = _current_dataset().grid
+    row = grid.locate_point(lon, lat)
+    if row < 0:
+        raise HTTPException(404, "No risk cell at this point")
+    return {
+        "lat": lat,
+        "lon": lon,
+        "risk": float(grid.risk[row]),
+        "partner": grid.partners[grid.partner_codes[row]],
+        "leader": grid.leaders[grid.leader_codes[row]],
+    }
+
+class PointBatch(BaseModel):
+    lat: list[float]
+    lon: list[float]
+
+def _risk_at_batch(grid, points: PointBatch) -> bytes:
+    if len(points.lat) != len(points.lon):
+        raise HTTPException(400, "lat and lon must have the same length")
+    if len(points.lat) > RISK_AT_MAX_POINTS:
+        raise HTTPException(413, f"At most {RISK_AT_MAX_POINTS} points per batch")
+
+    rows = grid.locate(np.array(points.lon, dtype=float), np.array(points.lat, dtype=float))
+    found = rows >= 0
+    hit = rows[found]
+    risk = np.full(len(rows), None, dtype=object)
+    partner = np.full(len(rows), None, dtype=object)
+    leader = np.full(len(rows), None, dtype=object)
+    risk[found] = grid.risk[hit]
+    partner[found] = grid.partners[grid.partner_codes[hit]]
+    leader[found] = grid.leaders[grid.leader_codes[hit]]
+    content = {"risk": risk.tolist(), "partner": partner.tolist(), "leader": leader.tolist()}
+    return pydantic_core.to_json(content)
+
+@app.post(
+    "/risk/at/batch",
+    openapi_extra={"requestBody": {"required": True,
+                                   "content": {"application/json": {"schema": PointBatch.model_json_schema()}}}},
+)
+async def get_risk_at_batch(request: Request):
+    """
+    Looks up many points at once, such as a GPS track. Takes ``lat`` and
+    ``lon`` arrays and returns ``risk``, ``partner`` and ``leader`` arrays
+    in the same order, with null for points outside the grid.
+    """
+    grid = _current_dataset().grid
+    # pydantic's own JSON parser reads long float arrays several times faster than json.loads
+    try:
+        points = PointBatch.model_validate_json(await request.body())
+    except ValidationError as e:
+        # Located under "body" as FastAPI reports body errors, without the input: for a body that is
+        # not JSON it is the raw bytes, and otherwise it can be 100k points
+        raise RequestValidationError([{**error, "loc": ("body", *error["loc"])}
+                                      for error in e.errors(include_url=False, include_input=False)])
+    body = await run_in_threadpool(_risk_at_batch, grid, points)
+    return Response(body, media_type="application/json")
+
+@app.get("/risk/nearest-danger")
+def get_nearest_danger(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    threshold: float = Query(None, ge=0, le=1),
+):
+    """
+    Returns the distance (metres) and bearing (degrees from north) from the
+    point ``lat``/``lon`` to the nearest cell with risk above ``threshold``,
+    one of the configured thresholds (all of them if omitted), with that
+    cell's centroid and risk. 404 when the point is in no cell.
+
+    ``distance_m`` is the WGS84 geodesic distance to the nearest point of
+    that cell's polygon (border cells as clipped), rounded to 0.1 m. It is
+    at most 1 m above the true nearest distance: the only approximation is
+    finding a cell's nearest point on a local plane around the query point.
+    """
+    field = _current_dataset().danger_field()
+    if threshold is None:
+        indices = range(len(field.thresholds))
+    else:
+        k = field.threshold_index(threshold)
+        if k < 0:
+            raise HTTPException(400, f"threshold must be one of {list(field.thresholds)}")
+        indices = [k]
+
+    danger = [field.lookup(lon, lat, k) for k in indices]
+    if danger[0] is None:
+        raise HTTPException(404, "Point is outside the risk grid")
+    return {"lat": lat, "lon": lon, "danger": danger}
+
+def _report_status(job: dict) -> dict:
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "created_at": job["created_at"],
+        "finished_at": job["finished_at"],
+        "error": job["error"],
+        "timings": job["timings"],
+        "url": f"/reports/{job['id']}",
+    }
+
+def _report_file(job: dict):
+    return FileResponse(job["path"], filename="ngo_activity_report.pdf", media_type="application/pdf")
+
+@app.post("/reports", status_code=202)
+def submit_report():
+    """
+    Queues a PDF activity report for the current spreadsheets and returns
+    its job. Poll ``GET /reports/{id}`` until the PDF is ready.
+    """
+    return _report_status(_reports.submit())
+
+@app.get("/reports/{job_id}")
+def get_report(job_id: str):
+    """
+    Returns the PDF once the job is done, its status (202) while it is
+    pending, and 500 with the error if rendering failed.
+    """
+    job = _reports.get(job_id)
+    if job is None:
+        raise HTTPException(404, f"No report job {job_id}")
+    if job["status"] == "done":
+        return _report_file(job)
+    if job["status"] == "failed":
+        raise HTTPException(500, f"Failed to generate PDF: {job['error']}")
+    return JSONResponse(_report_status(job), status_code=202)
+
 @app.post("/generate-pdf")
 def generate_pdf():
-    output_path = create_pdf()
-    return FileResponse(output_path, filename="ngo_activity_report.pdf", media_type="application/pdf")
\ No newline at end of file
+    """Blocking form of ``POST /reports`` kept for existing clients."""
+    job = _reports.wait(_reports.submit()["id"])
+    if job["status"] != "done":
+        raise HTTPException(500, f"Failed to generate PDF: {job['error']}")
+    return _report_file(job)
\ No newline at end of file
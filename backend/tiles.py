@@ -0,0 +1,163 @@
+"""
+Mapbox Vector Tiles for the risk grid.
+
+A TileSet wraps one dataset version: cells are projected to Web Mercator
+and indexed once, and each requested tile is clipped, simplified for its
+zoom level, encoded and kept in an in-memory LRU cache. Below
+``FULL_DETAIL_ZOOM`` cells are merged into lattice blocks of
+``block_factor(zoom)`` cells a side, as the GeoJSON endpoints do, so a
+low-zoom tile carries a few blocks instead of every cell under it.
+"""
+import math
+import threading
+from collections import OrderedDict
+
+import geopandas as gpd
+import numpy as np
+import shapely
+
+from grid_query import GridIndex, block_factor
+from response_cache import CachedPayload
+
+try:
+    import mapbox_vector_tile
+except ImportError:  # optional; the tile endpoint reports 501 without it
+    mapbox_vector_tile = None
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+EXTENT = 4096
+# Extra margin around each tile, in tile pixels, to avoid seams at edges
+BUFFER = 64
+MAX_ZOOM = 18
+
+# Half the Web Mercator world width in metres
+_ORIGIN = 20037508.342789244
+
+# lon/lat box around the 100 km Kharkiv region used for pre-seeding
+KHARKIV_BBOX = (35.3, 49.0, 37.2, 50.9)
+
+PROPERTIES = ("risk", "partner", "leader")
+
+
+def tile_bounds(z: int, x: int, y: int):
+    """Web Mercator bounds ``(minx, miny, maxx, maxy)`` of tile z/x/y."""
+    size = 2 * _ORIGIN / (1 << z)
+    minx = -_ORIGIN + x * size
+    maxy = _ORIGIN - y * size
+    return minx, maxy - size, minx + size, maxy
+
+
+def tiles_for_bbox(bbox, z: int):
+    """Yields the ``(x, y)`` tiles at zoom ``z`` covering a lon/lat bbox."""
+    minlon, minlat, maxlon, maxlat = bbox
+    n = 1 << z
+
+    def to_tile(lon, lat):
+        lat = math.radians(max(min(lat, 85.0511), -85.0511))
+        tx = int((lon + 180.0) / 360.0 * n)
+        ty = int((1.0 - math.asinh(math.tan(lat)) / math.pi) / 2.0 * n)
+        return min(max(tx, 0), n - 1), min(max(ty, 0), n - 1)
+
+    x0, y0 = to_tile(minlon, maxlat)
+    x1, y1 = to_tile(maxlon, minlat)
+    for tx in range(x0, x1 + 1):
+        for ty in range(y0, y1 + 1):
+            yield tx, ty
+
+
+class TileSet:
+    """
+    Vector tiles for one dataset version, with an LRU cache of encoded
+    tiles holding up to ``max_tiles`` entries.
+    """
+
+    def __init__(self, grid, version, max_tiles: int = 4096):
+        if mapbox_vector_tile is None:
+            raise RuntimeError("mapbox_vector_tile is not installed")
+        self.version = version
+        self.max_tiles = max_tiles
+        self._index = GridIndex(grid)
+        # block factor -> (projected geometries, STRtree, properties), built on first use
+        self._layers = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, z: int, x: int, y: int) -> CachedPayload:
+        key = (z, x, y)
+        with self._lock:
+            payload = self._cache.get(key)
+            if payload is not None:
+                self._cache.move_to_end(key)
+                return payload
+
+        body = self._render(z, x, y)
+        payload = CachedPayload(body=body, etag=f'"{str(self.version)[:12]}-{z}-{x}-{y}"')
+        with self._lock:
+            self._cache[key] = payload
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_tiles:
+                self._cache.popitem(last=False)
+        return payload
+
+    def seed(self, bbox=KHARKIV_BBOX, zooms=range(6, 11)) -> int:
+        """Renders every tile covering ``bbox`` at ``zooms``; returns the count."""
+        count = 0
+        for z in zooms:
+            for x, y in tiles_for_bbox(bbox, z):
+                self.get(z, x, y)
+                count += 1
+        return count
+
+    def _layer(self, factor: int):
+        """Cells (``factor`` 1) or lattice blocks in Web Mercator, with their index."""
+        with self._lock:
+            layer = self._layers.get(factor)
+        if layer is not None:
+            return layer
+
+        grid = self._index.grid
+        if factor <= 1:
+            geoms = grid.geometry()
+            props = {name: getattr(grid, name) for name in PROPERTIES}
+        else:
+            blocks = self._index.frame(np.arange(len(grid)), list(PROPERTIES), factor)
+            geoms = blocks.geometry.values
+            props = {name: blocks[name].to_numpy() for name in (*PROPERTIES, "cells")}
+        projected = np.asarray(gpd.GeoSeries(geoms, crs=grid.crs).to_crs("EPSG:3857").values)
+        layer = (projected, shapely.STRtree(projected), props)
+        with self._lock:
+            return self._layers.setdefault(factor, layer)
+
+    def _render(self, z: int, x: int, y: int) -> bytes:
+        minx, miny, maxx, maxy = tile_bounds(z, x, y)
+        pixel = (maxx - minx) / EXTENT
+        pad = BUFFER * pixel
+        clip = (minx - pad, miny - pad, maxx + pad, maxy + pad)
+
+        all_geoms, tree, all_props = self._layer(block_factor(z))
+        rows = np.sort(tree.query(shapely.box(*clip)))
+        if len(rows) == 0:
+            return b""
+        geoms = shapely.clip_by_rect(all_geoms[rows], *clip)
+        # Detail below one output pixel cannot be represented in the tile
+        geoms = shapely.simplify(geoms, pixel, preserve_topology=True)
+        keep = ~shapely.is_empty(geoms)
+
+        features = []
+        props = {name: values[rows] for name, values in all_props.items()}
+        for k in np.flatnonzero(keep):
+            properties = {
+                "risk": float(props["risk"][k]),
+                "partner": str(props["partner"][k]),
+                "leader": str(props["leader"][k]),
+            }
+            if "cells" in props:
+                properties["cells"] = int(props["cells"][k])
+            features.append({"geometry": geoms[k], "properties": properties})
+        if not features:
+            return b""
+        return mapbox_vector_tile.encode(
+            [{"name": "risk", "features": features}],
+            default_options={"quantize_bounds": (minx, miny, maxx, maxy), "extents": EXTENT},
+        )
@@ -0,0 +1,205 @@
+"""
+TopoJSON encoding of the risk-map GeoDataFrames.
+
+Neighbouring cells share their sides, so GeoJSON writes almost every lattice
+edge twice, each time as two full-precision coordinate pairs. TopoJSON
+writes every shared boundary once, as an arc of integer-quantized and
+delta-encoded positions, and each ring lists the arcs it is made of
+(``~k`` for arc ``k`` walked backwards).
+
+Arcs are built with array operations over all ring segments at once: after
+quantization, segments are deduplicated regardless of direction, and every
+vertex not touching exactly two distinct segments is a junction. A ring is
+cut into arcs at its junctions; a ring with no junction is cut at its lowest
+vertex, so rings that coincide produce the same arc. An arc is identified by
+its first segment (and direction) when walked from its lower-numbered end
+segment, which is the same for every ring that walks it in either
+direction.
+"""
+import json
+
+import numpy as np
+import shapely
+
+# Query parameter bounds for ``precision`` (10 ** precision positions per axis)
+MIN_PRECISION = 2
+MAX_PRECISION = 9
+# Starting precision when none is given; any precision is raised while a polygon collapses
+DEFAULT_PRECISION = 6
+
+
+def _properties(gdf):
+    """Feature ids and property dicts as ``GeoDataFrame.to_json`` writes them (NaN as null)."""
+    columns = gdf.columns.drop(gdf.geometry.name).tolist()
+    ids = [str(i) for i in np.asarray(gdf.index)]
+    if len(columns) == 0:
+        return ids, [{} for _ in ids]
+    # Column by column: tolist() gives Python scalars without boxing every cell
+    values = [[None if missing else v for v, missing in zip(gdf[c].tolist(), gdf[c].isna().tolist())]
+              if gdf[c].hasnans else gdf[c].tolist() for c in columns]
+    return ids, [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def _ring_arcs(geometries, quantization: int):
+    """
+    Splits the rings of every (Multi)Polygon in ``geometries`` into shared
+    arcs. Returns ``(transform, arcs, polygons, collapsed)``: the TopoJSON
+    transform, the delta-encoded arcs as lists of [dx, dy], for each
+    geometry its polygons as lists of rings of arc references, exterior
+    first, and the number of polygons left out because quantization
+    collapsed their exterior to zero area. Rings that collapse inside a
+    kept polygon are left out of it.
+    """
+    polygons, polygon_feature = shapely.get_parts(geometries, return_index=True)
+    rings, ring_polygon = shapely.get_rings(polygons, return_index=True)
+    coords, point_ring = shapely.get_coordinates(rings, return_index=True)
+
+    if len(coords):
+        lo, hi = coords.min(axis=0), coords.max(axis=0)
+    else:
+        lo, hi = np.zeros(2), np.ones(2)
+    scale = np.where(hi > lo, (hi - lo) / (quantization - 1), 1.0)
+    transform = {"scale": scale.tolist(), "translate": lo.tolist()}
+    q = np.rint((coords - lo) / scale).astype(np.int64)
+
+    # Rings quantization flattens: zero shoelace area, summed relative to each ring's first point
+    rel = q - q[np.searchsorted(point_ring, point_ring)]
+    same = point_ring[:-1] == point_ring[1:]
+    cross = (rel[:-1, 0] * rel[1:, 1] - rel[1:, 0] * rel[:-1, 1]) * same
+    flat = np.bincount(point_ring[:-1], weights=cross, minlength=len(rings)) == 0
+
+    # Distinct quantized positions become vertex ids 0..V-1
+    positions, vertex = np.unique(q[:, 0] * quantization + q[:, 1], return_inverse=True)
+    vertex = vertex.ravel()
+    n_vertices = len(positions)
+
+    # Segments between consecutive points of a ring, minus those quantization collapsed
+    keep = (point_ring[:-1] == point_ring[1:]) & (vertex[:-1] != vertex[1:])
+    vs, ve, seg_ring = vertex[:-1][keep], vertex[1:][keep], point_ring[:-1][keep]
+    forward = vs < ve
+    undirected = np.unique(np.minimum(vs, ve) * n_vertices + np.maximum(vs, ve), return_inverse=True)
+    segment = undirected[1].ravel()
+    n_segments = len(segment)
+
+    # Junctions: vertices on a number of distinct segments other than two
+    ends = np.concatenate((undirected[0] // n_vertices, undirected[0] % n_vertices))
+    junction = np.bincount(ends, minlength=n_vertices) != 2
+    cut = junction[vs]
+
+    # Every ring that kept a segment starts an arc at its first junction, or at its lowest vertex
+    ring_ids, ring_first, ring_len = np.unique(seg_ring, return_index=True, return_counts=True)
+    ring_pos = np.repeat(np.arange(len(ring_ids)), ring_len)
+    has_cut = np.logical_or.reduceat(cut, ring_first) if n_segments else np.zeros(0, dtype=bool)
+    if not has_cut.all():
+        lowest = np.minimum.reduceat(vs, ring_first)
+        cut |= ~has_cut[ring_pos] & (vs == lowest[ring_pos])
+    cut_at = np.flatnonzero(cut)
+    first_cut = cut_at[np.searchsorted(ring_pos[cut_at], np.arange(len(ring_ids)))]
+
+    # Rotate each ring to begin at its first cut, so arcs are contiguous runs
+    offset = np.arange(n_segments) - ring_first[ring_pos]
+    shift = first_cut - ring_first
+    rotated = np.empty(n_segments, dtype=np.int64)
+    rotated[ring_first[ring_pos] + (offset - shift[ring_pos]) % ring_len[ring_pos]] = np.arange(n_segments)
+    vs, ve, segment, forward, cut = vs[rotated], ve[rotated], segment[rotated], forward[rotated], cut[rotated]
+
+    run_start = np.flatnonzero(cut)
+    run_end = np.append(run_start[1:], n_segments) - 1
+    run_ring = ring_pos[run_start]
+
+    # Canonical direction: from the lower-numbered end segment
+    first_seg, last_seg = segment[run_start], segment[run_end]
+    along = (first_seg < last_seg) | ((first_seg == last_seg) & forward[run_start])
+    key = np.where(along, 2 * first_seg + forward[run_start], 2 * last_seg + ~forward[run_end])
+    _, representative, arc = np.unique(key, return_index=True, return_inverse=True)
+    arc = arc.ravel()
+    refs = np.where(along, arc, ~arc)
+
+    # Vertices of each arc, walked in its canonical direction
+    start, end = run_start[representative], run_end[representative]
+    lengths = end - start + 2
+    arc_first = np.append(0, np.cumsum(lengths))
+    step = np.arange(arc_first[-1]) - np.repeat(arc_first[:-1], lengths)
+    reverse = np.repeat(~along[representative], lengths)
+    step = np.where(reverse, np.repeat(lengths - 1, lengths) - step, step)
+    last = np.repeat(lengths - 1, lengths)
+    at = np.repeat(start, lengths) + np.minimum(step, last - 1)
+    points = np.where(step == last, ve[np.repeat(end, lengths)], vs[at])
+    xy = np.column_stack((positions[points] // quantization, positions[points] % quantization))
+    delta = xy.copy()
+    delta[1:] -= xy[:-1]
+    delta[arc_first[:-1]] = xy[arc_first[:-1]]
+    pairs = delta.tolist()
+    arcs = [pairs[a:b] for a, b in zip(arc_first[:-1].tolist(), arc_first[1:].tolist())]
+
+    # Arc references per ring, then rings per polygon and polygons per feature
+    ref_list = refs.tolist()
+    run_first = np.searchsorted(run_ring, np.arange(len(ring_ids) + 1))
+    ring_refs = [None] * len(rings)
+    for r, a, b in zip(ring_ids.tolist(), run_first[:-1].tolist(), run_first[1:].tolist()):
+        ring_refs[r] = ref_list[a:b]
+
+    polygon_rings = [[] for _ in range(len(polygons))]
+    exterior = np.r_[True, ring_polygon[1:] != ring_polygon[:-1]] if len(ring_polygon) else np.zeros(0, dtype=bool)
+    for r, (p, outer) in enumerate(zip(ring_polygon.tolist(), exterior.tolist())):
+        refs_r = None if flat[r] else ring_refs[r]
+        # A polygon whose exterior collapsed is left out, holes and all
+        if refs_r is None:
+            if outer:
+                polygon_rings[p] = None
+        elif polygon_rings[p] is not None:
+            polygon_rings[p].append(refs_r)
+
+    feature_polygons = [[] for _ in range(len(geometries))]
+    for p, f in enumerate(polygon_feature.tolist()):
+        if polygon_rings[p]:
+            feature_polygons[f].append(polygon_rings[p])
+    collapsed = sum(rings_p is None for rings_p in polygon_rings)
+    return transform, arcs, feature_polygons, collapsed
+
+
+def to_topojson(objects: dict, precision: int = None) -> bytes:
+    """
+    Encodes ``{name: GeoDataFrame}`` of (Multi)Polygons as one Topology with
+    a GeometryCollection per name, all sharing one set of arcs quantized to
+    ``10 ** precision`` positions per axis over their joint bounds. Ids and
+    properties are those ``GeoDataFrame.to_json`` writes.
+
+    Encoding starts at ``precision`` (``DEFAULT_PRECISION`` when not given)
+    and adds a digit, up to ``MAX_PRECISION``, while quantization collapses
+    any polygon to zero area. Only a polygon still collapsed at
+    ``MAX_PRECISION`` is left out (a feature left with none has a null
+    geometry).
+    """
+    if precision is not None and not MIN_PRECISION <= precision <= MAX_PRECISION:
+        raise ValueError(f"precision must be between {MIN_PRECISION} and {MAX_PRECISION}, got {precision}")
+    frames = list(objects.values())
+    geometries = np.concatenate([np.asarray(gdf.geometry.values, dtype=object) for gdf in frames]) \
+        if frames else np.array([], dtype=object)
+    digits = DEFAULT_PRECISION if precision is None else precision
+    transform, arcs, polygons, collapsed = _ring_arcs(geometries, 10 ** digits)
+    while collapsed and digits < MAX_PRECISION:
+        digits += 1
+        transform, arcs, polygons, collapsed = _ring_arcs(geometries, 10 ** digits)
+    multi = (shapely.get_type_id(geometries) == shapely.GeometryType.MULTIPOLYGON).tolist()
+
+    collections, f = {}, 0
+    for name, gdf in objects.items():
+        ids, properties = _properties(gdf)
+        geometries_out = []
+        for fid, props in zip(ids, properties):
+            parts = polygons[f]
+            if not parts:
+                geometry = {"type": None}
+            elif multi[f]:
+                geometry = {"type": "MultiPolygon", "arcs": parts}
+            else:
+                geometry = {"type": "Polygon", "arcs": parts[0]}
+            geometry["id"] = fid
+            geometry["properties"] = props
+            geometries_out.append(geometry)
+            f += 1
+        collections[name] = {"type": "GeometryCollection", "geometries": geometries_out}
+
+    topology = {"type": "Topology", "transform": transform, "objects": collections, "arcs": arcs}
+    return json.dumps(topology, separators=(",", ":")).encode("utf-8")
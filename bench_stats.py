@@ -0,0 +1,118 @@
+"""
+Risk statistics at 1M cells: the previous per-statistic passes of
+generate_risk_statistics / generate_risk_analysis against risk_stats.
+
+Risks are synthetic but shaped like the partitioned grid (about 58% zeros,
+the rest spread over (0, 1]) on a lattice of unique centroids. The chunked
+row feeds 64k-value chunks into separate RiskHistograms and merges them.
+
+Usage:
+    python bench_stats.py [--cells 1000000] [--repeat 3]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from risk_stats import RiskHistogram, count_unique_points, summarize
+
+SIMPLE_EDGES = (0.0, 0.2, 0.4, 0.6, 0.8)
+ADVANCED_EDGES = (0.3, 0.7)
+
+
+def _legacy(risk_data):
+    """The statistics both scripts computed before risk_stats, minus printing."""
+    risks = [item['risk'] for item in risk_data]
+    advanced = {
+        'total_areas': len(risks),
+        'min_risk': min(risks),
+        'max_risk': max(risks),
+        'mean_risk': np.mean(risks),
+        'median_risk': np.median(risks),
+        'std_risk': np.std(risks),
+        'high_risk_areas': sum(1 for r in risks if r > 0.7),
+        'medium_risk_areas': sum(1 for r in risks if 0.3 < r <= 0.7),
+        'low_risk_areas': sum(1 for r in risks if r <= 0.3),
+        'zero_risk_areas': sum(1 for r in risks if r == 0),
+    }
+    risks = [item['risk'] for item in risk_data]
+    simple = {
+        'total_areas': len(risks),
+        'min_risk': min(risks),
+        'max_risk': max(risks),
+        'mean_risk': np.mean(risks),
+        'median_risk': np.median(risks),
+        'std_risk': np.std(risks),
+        'q25_risk': np.percentile(risks, 25),
+        'q75_risk': np.percentile(risks, 75),
+        'zero_risk': sum(1 for r in risks if r == 0.0),
+        'very_low_risk': sum(1 for r in risks if 0.0 < r <= 0.2),
+        'low_risk': sum(1 for r in risks if 0.2 < r <= 0.4),
+        'medium_risk': sum(1 for r in risks if 0.4 < r <= 0.6),
+        'high_risk': sum(1 for r in risks if 0.6 < r <= 0.8),
+        'very_high_risk': sum(1 for r in risks if r > 0.8),
+        'unique_locations': len(set((d['lat'], d['lon']) for d in risk_data)),
+    }
+    return advanced, simple
+
+
+def _engine(lat, lon, risk):
+    advanced = summarize(risk, band_edges=ADVANCED_EDGES, quantiles=(0.5,))
+    simple = summarize(risk, band_edges=SIMPLE_EDGES)
+    return advanced, simple, count_unique_points(lat, lon)
+
+
+def _chunked(risk, chunk_size=1 << 16):
+    parts = [RiskHistogram(SIMPLE_EDGES).update(risk[k:k + chunk_size]) for k in range(0, len(risk), chunk_size)]
+    total = RiskHistogram(SIMPLE_EDGES)
+    for part in parts:
+        total.merge(part)
+    return total.summary()
+
+
+def _best(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cells", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    side = int(np.ceil(np.sqrt(args.cells)))
+    k = np.arange(args.cells)
+    lon = 35.0 + 0.01 * (k % side)
+    lat = 49.0 + 0.01 * (k // side)
+    risk = np.where(rng.random(args.cells) < 0.58, 0.0, np.round(rng.random(args.cells), 6))
+    risk_data = [{'lat': a, 'lon': o, 'risk': r} for a, o, r in zip(lat.tolist(), lon.tolist(), risk.tolist())]
+
+    legacy_s, (old_adv, old_simple) = _best(lambda: _legacy(risk_data), args.repeat)
+    engine_s, (adv, simple, unique) = _best(lambda: _engine(lat, lon, risk), args.repeat)
+    chunked_s, merged = _best(lambda: _chunked(risk), args.repeat)
+
+    # The engine must reproduce the legacy numbers
+    assert [old_adv['low_risk_areas'], old_adv['medium_risk_areas'], old_adv['high_risk_areas']] == adv['bands']
+    assert old_adv['zero_risk_areas'] == adv['zero'] == simple['zero'] == merged['zero']
+    assert [old_simple[key] for key in ('very_low_risk', 'low_risk', 'medium_risk', 'high_risk', 'very_high_risk')] \
+        == simple['bands'][1:] == merged['bands'][1:]
+    assert old_simple['unique_locations'] == unique
+    assert np.isclose(old_simple['mean_risk'], simple['mean']) and np.isclose(old_simple['std_risk'], simple['std'])
+    assert np.isclose(old_simple['mean_risk'], merged['mean']) and np.isclose(old_simple['std_risk'], merged['std'])
+    assert (old_simple['q25_risk'], old_simple['median_risk'], old_simple['q75_risk']) == tuple(simple['quantiles'].values())
+    quantile_error = max(abs(merged['quantiles'][q] - simple['quantiles'][q]) for q in simple['quantiles'])
+
+    print(f"{args.cells:,} cells (best of {args.repeat})")
+    print(f"  legacy passes          {legacy_s * 1000:8.1f} ms")
+    print(f"  summarize + unique     {engine_s * 1000:8.1f} ms  ({legacy_s / engine_s:.0f}x)")
+    print(f"  chunked histograms     {chunked_s * 1000:8.1f} ms  (max quantile error {quantile_error:.5f})")
+
+
+if __name__ == "__main__":
+    main()
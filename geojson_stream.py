@@ -0,0 +1,188 @@
+"""
+Streaming reader for the partitioned risk-grid GeoJSON.
+
+``read_risk_points`` walks the FeatureCollection one feature at a time and
+writes each polygon's centroid and risk straight into NumPy arrays, filled in
+fixed-size chunks. Only the current read block, one feature and the output
+arrays are held in memory, however large the file is. Needs only the standard
+library and NumPy, so both heatmap scripts can use it.
+"""
+import json
+from typing import NamedTuple
+
+import numpy as np
+
+# Characters read from the file per block
+READ_BLOCK = 1 << 20
+
+# Features written into each preallocated output chunk
+CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = " \t\n\r"
+
+
+class RiskPoints(NamedTuple):
+    """Centroid longitude, latitude and risk per polygon, as float64 arrays."""
+    lon: np.ndarray
+    lat: np.ndarray
+    risk: np.ndarray
+
+
+class _JsonStream:
+    """Incremental JSON tokenizer over a text file: one value at a time."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        """Appends the next block, dropping what was already consumed; False at EOF."""
+        if self.eof:
+            return False
+        block = self.f.read(READ_BLOCK)
+        if not block:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + block
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """The next non-whitespace character without consuming it; "" at EOF."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in GeoJSON, found {found or 'end of file'!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decodes the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # Most likely cut off at the end of the block
+                if self._fill():
+                    continue
+                raise
+            # A number ending at the block boundary may continue in the next block
+            if end == len(self.buf) and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+
+def _ring_centroid_area(ring):
+    """Shoelace centroid x, y and unsigned area of a ring; the vertex mean if it has no area."""
+    x0, y0 = ring[0][0], ring[0][1]
+    area2 = cx = cy = 0.0
+    # Coordinates relative to the first vertex keep the cross products small
+    px, py = 0.0, 0.0
+    for c in ring[1:] + ring[:1]:
+        x, y = c[0] - x0, c[1] - y0
+        cross = px * y - x * py
+        area2 += cross
+        cx += (px + x) * cross
+        cy += (py + y) * cross
+        px, py = x, y
+    if area2 == 0:
+        unique = ring[:-1] if len(ring) > 1 and ring[0] == ring[-1] else ring
+        return sum(c[0] for c in unique) / len(unique), sum(c[1] for c in unique) / len(unique), 0.0
+    return x0 + cx / (3 * area2), y0 + cy / (3 * area2), abs(area2) / 2
+
+
+def polygon_centroid(rings):
+    """Exact area-weighted centroid ``(x, y)`` of a GeoJSON polygon (holes subtracted)."""
+    x, y, area = _ring_centroid_area(rings[0])
+    if area == 0 or len(rings) == 1:
+        return x, y
+    sx, sy, total = x * area, y * area, area
+    for hole in rings[1:]:
+        hx, hy, hole_area = _ring_centroid_area(hole)
+        sx -= hx * hole_area
+        sy -= hy * hole_area
+        total -= hole_area
+    return sx / total, sy / total
+
+
+def _iter_features(stream: _JsonStream):
+    """Yields the features of a FeatureCollection; other members are skipped."""
+    stream.expect("{")
+    while stream.peek() != "}":
+        key = stream.value()
+        stream.expect(":")
+        if key != "features":
+            stream.value()
+            if stream.peek() == ",":
+                stream.pos += 1
+            continue
+
+        stream.expect("[")
+        if stream.peek() == "]":
+            return
+        while True:
+            yield stream.value()
+            char = stream.peek()
+            if char == ",":
+                stream.pos += 1
+            elif char == "]":
+                return
+            else:
+                raise ValueError(f"Expected ',' or ']' between features, found {char or 'end of file'!r}")
+
+
+def read_risk_points(filepath, chunk_size: int = CHUNK_SIZE, on_progress=None) -> RiskPoints:
+    """
+    Streams ``filepath`` and returns the centroid and risk of every Polygon
+    feature; other geometry types are skipped and a missing risk counts as 0.
+    Centroids come from the ``centroid_x``/``centroid_y`` properties written
+    with the grid, or else are computed exactly from the rings.
+    ``on_progress(n)`` is called every ``chunk_size`` features read.
+    """
+    chunks = []
+    lon = lat = risk = None
+    filled = chunk_size  # forces the first allocation
+    read = 0
+    with open(filepath, "r", encoding="utf-8") as f:
+        for feature in _iter_features(_JsonStream(f)):
+            read += 1
+            if on_progress is not None and read % chunk_size == 0:
+                on_progress(read)
+
+            geometry = feature.get("geometry") or {}
+            if geometry.get("type") != "Polygon" or not geometry.get("coordinates"):
+                continue
+            properties = feature.get("properties") or {}
+            x, y = properties.get("centroid_x"), properties.get("centroid_y")
+            if x is None or y is None:
+                rings = [[c for c in ring if len(c) >= 2] for ring in geometry["coordinates"]]
+                if not rings[0]:
+                    continue
+                x, y = polygon_centroid([ring for ring in rings if ring])
+
+            if filled == chunk_size:
+                lon, lat, risk = (np.empty(chunk_size) for _ in range(3))
+                chunks.append((lon, lat, risk))
+                filled = 0
+            lon[filled] = x
+            lat[filled] = y
+            risk[filled] = properties.get("risk") or 0
+            filled += 1
+
+    if not chunks:
+        return RiskPoints(np.empty(0), np.empty(0), np.empty(0))
+    # Trim the last, partly filled chunk and join the chunks column by column
+    chunks[-1] = tuple(a[:filled] for a in chunks[-1])
+    return RiskPoints(*(np.concatenate(column) for column in zip(*chunks)))
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Heatmap pipeline: every visualization of both heatmap scripts in one run.
+
+The GeoJSON is parsed once. Its centroid and risk arrays are copied into a
+shared memory block that worker processes map without copying, and the
+requested outputs render in parallel, slowest first. Each output is keyed by
+a hash of the input file and of the code that draws it. An output whose key
+matches the manifest in the output directory, and whose file still exists,
+is skipped; when every requested output is up to date the file is not even
+parsed. Matplotlib runs on the Agg backend, so nothing blocks on a window.
+
+Usage:
+    python heatmap_pipeline.py [--input FILE] [--output-dir DIR]
+                               [--outputs NAME ...] [--skip NAME ...]
+                               [--jobs N] [--force] [--stats]
+"""
+import argparse
+import hashlib
+import importlib
+import json
+import multiprocessing
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+
+# Workers inherit the environment, so none of them opens a window
+os.environ["MPLBACKEND"] = "Agg"
+
+from geojson_stream import RiskPoints, read_risk_points  # noqa: E402
+
+DEFAULT_INPUT = 'kharkiv_mine_risk_leader_partitioned.json'
+
+MANIFEST_NAME = '.heatmap_pipeline.json'
+
+HERE = Path(__file__).resolve().parent
+
+# Output name -> (module, function, default file, first argument).
+# Ordered slowest first so a short pool finishes with the quick outputs.
+OUTPUTS = {
+    'polygon': ('kharkiv_heatmap', 'create_polygon_heatmap', 'kharkiv_polygon_heatmap.png', 'path'),
+    'interpolated': ('kharkiv_heatmap', 'create_interpolated_heatmap', 'kharkiv_interpolated_heatmap.png', 'points'),
+    'static': ('kharkiv_heatmap', 'create_static_heatmap', 'kharkiv_mine_risk_heatmap.png', 'points'),
+    'simple': ('kharkiv_simple_heatmap', 'create_scatter_heatmap', 'kharkiv_simple_heatmap.png', 'points'),
+    'interactive': ('kharkiv_heatmap', 'create_interactive_heatmap', 'kharkiv_interactive_heatmap.html', 'points'),
+    'grid': ('kharkiv_simple_heatmap', 'create_grid_heatmap', 'kharkiv_grid_heatmap.png', 'points'),
+    'distribution': ('kharkiv_simple_heatmap', 'create_risk_distribution_plot', 'kharkiv_risk_distribution.png', 'points'),
+}
+
+# Helper modules whose changes can alter any output
+SHARED_SOURCES = ('geojson_stream.py', 'risk_raster.py', 'risk_interp.py')
+
+# Set in each worker by _attach_points
+_shared = None
+_points = None
+
+
+def _file_digest(path) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def output_key(name: str, input_digest: str) -> str:
+    """Hex digest of the input file and of the source files that draw output ``name``."""
+    module = OUTPUTS[name][0]
+    payload = {
+        'output': name,
+        'input': input_digest,
+        'sources': {src: _file_digest(HERE / src) for src in (f'{module}.py',) + SHARED_SOURCES},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()[:32]
+
+
+def _load_manifest(output_dir: Path) -> dict:
+    try:
+        with open(output_dir / MANIFEST_NAME, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(output_dir: Path, manifest: dict):
+    # Write to a temporary file first so an interrupted run never leaves half a manifest
+    path = output_dir / MANIFEST_NAME
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _share_points(points: RiskPoints) -> shared_memory.SharedMemory:
+    """Copies the arrays into a new shared block laid out as a (3, n) float64 array."""
+    n = len(points.risk)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, 3 * n * 8))
+    np.ndarray((3, n), dtype=np.float64, buffer=shm.buf)[:] = points
+    return shm
+
+
+def _attach_points(name: str, n: int):
+    """Worker initializer: maps the shared arrays as read-only RiskPoints."""
+    global _shared, _points
+    _shared = shared_memory.SharedMemory(name=name)
+    columns = np.ndarray((3, n), dtype=np.float64, buffer=_shared.buf)
+    columns.flags.writeable = False
+    _points = RiskPoints(*columns)
+
+
+def _render(name: str, input_file: str, output_file: str, points=None) -> float:
+    """Draws output ``name`` into ``output_file``; returns the seconds it took."""
+    import matplotlib.pyplot as plt
+    module, function, _, argument = OUTPUTS[name]
+    draw = getattr(importlib.import_module(module), function)
+    t0 = time.perf_counter()
+    try:
+        with warnings.catch_warnings():
+            # The simple script calls plt.show(), which only warns on Agg
+            warnings.filterwarnings('ignore', message='.*non-interactive.*')
+            draw(input_file if argument == 'path' else (_points if points is None else points), output_file=output_file)
+    finally:
+        plt.close('all')
+    return time.perf_counter() - t0
+
+
+def run_pipeline(input_file=DEFAULT_INPUT, output_dir='.', outputs=None, jobs=None,
+                 force: bool = False, stats: bool = False) -> dict:
+    """
+    Renders ``outputs`` (all of OUTPUTS by default) from ``input_file`` into
+    ``output_dir`` and returns ``{name: status}``, with status "skipped",
+    "rendered" or the error message. ``jobs`` caps the worker processes
+    (default: one per CPU); with 1 everything renders in this process.
+    ``force`` ignores the manifest and ``stats`` prints the risk analysis.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    names = list(OUTPUTS) if outputs is None else [n for n in OUTPUTS if n in outputs]
+
+    input_digest = _file_digest(input_file)
+    manifest = _load_manifest(output_dir)
+    keys = {name: output_key(name, input_digest) for name in names}
+    paths = {name: str(output_dir / OUTPUTS[name][2]) for name in names}
+    todo = [name for name in names
+            if force or manifest.get(OUTPUTS[name][2]) != keys[name] or not os.path.exists(paths[name])]
+
+    results = {name: 'skipped' for name in names if name not in todo}
+    for name in results:
+        print(f"⏭️  {name}: {paths[name]} is up to date")
+    if not todo and not stats:
+        return results
+
+    t0 = time.perf_counter()
+    points = read_risk_points(input_file)
+    print(f"Parsed {len(points.risk):,} polygons in {time.perf_counter() - t0:.1f} s")
+    if stats:
+        from kharkiv_simple_heatmap import generate_risk_analysis
+        generate_risk_analysis(points)
+    if not todo:
+        return results
+
+    jobs = min(len(todo), jobs or os.cpu_count() or 1)
+    print(f"Rendering {len(todo)} output(s) with {jobs} process(es)...")
+    seconds = {}
+    if jobs == 1:
+        for name in todo:
+            try:
+                seconds[name] = _render(name, input_file, paths[name], points)
+            except Exception as e:
+                results[name] = str(e)
+    else:
+        shm = _share_points(points)
+        try:
+            with ProcessPoolExecutor(jobs, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_attach_points, initargs=(shm.name, len(points.risk))) as pool:
+                futures = {pool.submit(_render, name, input_file, paths[name]): name for name in todo}
+                for future in as_completed(futures):
+                    name = futures[future]
+                    try:
+                        seconds[name] = future.result()
+                    except Exception as e:
+                        results[name] = str(e)
+        finally:
+            shm.close()
+            shm.unlink()
+
+    for name in todo:
+        if name in seconds:
+            results[name] = 'rendered'
+            manifest[OUTPUTS[name][2]] = keys[name]
+            print(f"✅ {name}: {paths[name]} ({seconds[name]:.1f} s)")
+        else:
+            print(f"❌ {name}: {results[name]}")
+    _save_manifest(output_dir, manifest)
+    print(f"Finished in {time.perf_counter() - t0:.1f} s")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", default=DEFAULT_INPUT, help="partitioned risk GeoJSON")
+    parser.add_argument("--output-dir", default=".")
+    parser.add_argument("--outputs", nargs="+", choices=list(OUTPUTS), help="render only these outputs")
+    parser.add_argument("--skip", nargs="+", choices=list(OUTPUTS), default=[], help="leave these outputs out")
+    parser.add_argument("--jobs", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--force", action="store_true", help="re-render even if the inputs are unchanged")
+    parser.add_argument("--stats", action="store_true", help="print the risk analysis")
+    args = parser.parse_args()
+
+    outputs = [name for name in (args.outputs or OUTPUTS) if name not in args.skip]
+    try:
+        results = run_pipeline(args.input, args.output_dir, outputs, jobs=args.jobs, force=args.force, stats=args.stats)
+    except FileNotFoundError:
+        print(f"❌ Error: Could not find file '{args.input}'")
+        return 1
+    return 0 if all(status in ('skipped', 'rendered') for status in results.values()) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,7 +5,6 @@ Kharkiv Mine Risk Heatmap Visualization
 This script loads the Kharkiv mine risk GeoJSON data and creates interactive and static heatmaps.
 """
 
-import json
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -15,64 +14,38 @@ from matplotlib.collections import PatchCollection
 import folium
 from folium.plugins import HeatMap
 import geopandas as gpd
-from shapely.geometry import shape
 import seaborn as sns
-from scipy.interpolate import griddata
 
-def load_geojson_data(filepath):
-    """Load and parse the GeoJSON file."""
-    print(f"Loading data from {filepath}...")
-    with open(filepath, 'r') as f:
-        data = json.load(f)
-    
-    print(f"Loaded {len(data['features'])} features")
-    return data
+from geojson_stream import read_risk_points
+from risk_interp import LatticeInterpolator
+from risk_raster import draw_points, draw_raster, rasterize
+from risk_stats import summarize
 
-def extract_risk_data(geojson_data):
-    """Extract risk values and coordinates from GeoJSON features."""
-    risk_data = []
-    
-    for feature in geojson_data['features']:
-        risk = feature['properties'].get('risk', 0)
-        geometry = feature['geometry']
-        
-        if geometry['type'] == 'Polygon':
-            # Get the centroid of the polygon
-            coords = geometry['coordinates'][0]  # First ring
-            lons = [coord[0] for coord in coords]
-            lats = [coord[1] for coord in coords]
-            
-            # Calculate centroid
-            centroid_lon = sum(lons) / len(lons)
-            centroid_lat = sum(lats) / len(lats)
-            
-            risk_data.append({
-                'lat': centroid_lat,
-                'lon': centroid_lon,
-                'risk': risk,
-                'geometry': shape(geometry)
-            })
-    
-    return risk_data
+# Low (<=0.3), medium and high (>0.7) risk bands for the statistics
+RISK_BAND_EDGES = (0.3, 0.7)
+
+def load_risk_points(filepath):
+    """Stream the GeoJSON file into centroid and risk arrays (RiskPoints)."""
+    print(f"Loading data from {filepath}...")
+    points = read_risk_points(filepath)
+    print(f"Loaded {len(points.risk)} polygons")
+    return points
 
-def create_static_heatmap(risk_data, output_file='kharkiv_mine_risk_heatmap.png'):
-    """Create a static heatmap using matplotlib."""
+def create_static_heatmap(points, output_file='kharkiv_mine_risk_heatmap.png', agg='mean'):
+    """Create a static heatmap using matplotlib (one raster, ``agg`` risk per pixel)."""
     print("Creating static heatmap...")
     
-    # Extract data for plotting
-    lats = [item['lat'] for item in risk_data]
-    lons = [item['lon'] for item in risk_data]
-    risks = [item['risk'] for item in risk_data]
+    lons, lats, risks = points
     
     # Create figure and axis
     fig, ax = plt.subplots(figsize=(15, 12))
     
-    # Create a scatter plot with color mapping
-    scatter = ax.scatter(lons, lats, c=risks, cmap='YlOrRd', 
-                        s=1, alpha=0.7, edgecolors='none')
+    # Bin the cells into one image instead of drawing a marker per cell
+    image, extent = rasterize(lons, lats, risks, agg=agg, max_shape=(12 * 300, 15 * 300))
+    raster = draw_raster(ax, image, extent, cmap='YlOrRd', vmin=risks.min(), vmax=risks.max(), alpha=0.7)
     
     # Add colorbar
-    cbar = plt.colorbar(scatter, ax=ax, shrink=0.8)
+    cbar = plt.colorbar(raster, ax=ax, shrink=0.8)
     cbar.set_label('Mine Risk Level', fontsize=12)
     
     # Set labels and title
@@ -87,55 +60,40 @@ def create_static_heatmap(risk_data, output_file='kharkiv_mine_risk_heatmap.png'
     ax.set_aspect('equal', adjustable='box')
     
     # Add statistics text
-    stats_text = f'Risk Statistics:\nMin: {min(risks):.3f}\nMax: {max(risks):.3f}\nMean: {np.mean(risks):.3f}\nStd: {np.std(risks):.3f}'
+    stats_text = f'Risk Statistics:\nMin: {risks.min():.3f}\nMax: {risks.max():.3f}\nMean: {np.mean(risks):.3f}\nStd: {np.std(risks):.3f}'
     ax.text(0.02, 0.98, stats_text, transform=ax.transAxes, 
             verticalalignment='top', bbox=dict(boxstyle='round', facecolor='white', alpha=0.8))
     
     plt.tight_layout()
-    plt.savefig(output_file, dpi=300, bbox_inches='tight')
+    # fig.savefig: pyplot's savefig draws the whole figure once more afterwards
+    fig.savefig(output_file, dpi=300, bbox_inches='tight')
     print(f"Static heatmap saved as {output_file}")
     return fig
 
-def create_interpolated_heatmap(risk_data, output_file='kharkiv_interpolated_heatmap.png'):
-    """Create an interpolated grid heatmap."""
+def create_interpolated_heatmap(points, output_file='kharkiv_interpolated_heatmap.png',
+                                method='bicubic', grid_resolution=1000):
+    """Create an interpolated grid heatmap (``method``: bilinear, bicubic or idw)."""
     print("Creating interpolated heatmap...")
     
-    # Extract coordinates and risk values
-    lats = np.array([item['lat'] for item in risk_data])
-    lons = np.array([item['lon'] for item in risk_data])
-    risks = np.array([item['risk'] for item in risk_data])
-    
-    # Create a regular grid
-    lat_min, lat_max = lats.min(), lats.max()
-    lon_min, lon_max = lons.min(), lons.max()
-    
-    # Create grid points
-    grid_resolution = 200
-    lon_grid = np.linspace(lon_min, lon_max, grid_resolution)
-    lat_grid = np.linspace(lat_min, lat_max, grid_resolution)
-    lon_mesh, lat_mesh = np.meshgrid(lon_grid, lat_grid)
-    
-    # Interpolate risk values onto the grid
-    points = np.column_stack((lons, lats))
-    grid_points = np.column_stack((lon_mesh.ravel(), lat_mesh.ravel()))
+    lons, lats, risks = points
     
-    # Use griddata for interpolation
-    interpolated_risks = griddata(points, risks, grid_points, method='cubic', fill_value=0)
-    interpolated_risks = interpolated_risks.reshape(lon_mesh.shape)
+    # Resample the cell lattice onto a regular grid
+    interpolator = LatticeInterpolator(lons, lats, risks)
+    shape = (grid_resolution, grid_resolution)
+    interpolated_risks = interpolator.grid(shape, method=method, fill_value=0)
     
     # Create the plot
     fig, ax = plt.subplots(figsize=(15, 12))
     
     # Create heatmap
-    im = ax.imshow(interpolated_risks, extent=[lon_min, lon_max, lat_min, lat_max], 
-                   cmap='YlOrRd', aspect='auto', origin='lower', alpha=0.8)
+    im = draw_raster(ax, interpolated_risks, interpolator.extent, cmap='YlOrRd', alpha=0.8, aspect='auto')
     
     # Add colorbar
     cbar = plt.colorbar(im, ax=ax, shrink=0.8)
     cbar.set_label('Mine Risk Level', fontsize=12)
     
-    # Overlay scatter points
-    ax.scatter(lons, lats, c='black', s=0.1, alpha=0.3)
+    # Overlay the cell centroids
+    draw_points(ax, lons, lats, interpolator.extent, shape, color='black', alpha=0.3, aspect='auto')
     
     # Set labels and title
     ax.set_xlabel('Longitude', fontsize=12)
@@ -150,16 +108,16 @@ def create_interpolated_heatmap(risk_data, output_file='kharkiv_interpolated_hea
     print(f"Interpolated heatmap saved as {output_file}")
     return fig
 
-def create_interactive_heatmap(risk_data, output_file='kharkiv_interactive_heatmap.html'):
+def create_interactive_heatmap(points, output_file='kharkiv_interactive_heatmap.html'):
     """Create an interactive heatmap using Folium."""
     print("Creating interactive heatmap...")
     
     # Extract data for heatmap
-    heat_data = [[item['lat'], item['lon'], item['risk']] for item in risk_data]
+    heat_data = np.column_stack((points.lat, points.lon, points.risk)).tolist()
     
     # Calculate center point
-    center_lat = np.mean([item['lat'] for item in risk_data])
-    center_lon = np.mean([item['lon'] for item in risk_data])
+    center_lat = np.mean(points.lat)
+    center_lon = np.mean(points.lon)
     
     # Create base map
     m = folium.Map(
@@ -194,12 +152,12 @@ def create_interactive_heatmap(risk_data, output_file='kharkiv_interactive_heatm
     print(f"Interactive heatmap saved as {output_file}")
     return m
 
-def create_polygon_heatmap(geojson_data, output_file='kharkiv_polygon_heatmap.png'):
+def create_polygon_heatmap(filepath, output_file='kharkiv_polygon_heatmap.png'):
     """Create a heatmap showing actual polygon boundaries."""
     print("Creating polygon-based heatmap...")
     
-    # Convert to GeoDataFrame
-    gdf = gpd.GeoDataFrame.from_features(geojson_data['features'])
+    # Read only the risk column and geometries; GDAL streams the file
+    gdf = gpd.read_file(filepath, columns=['risk'])
     
     # Create figure
     fig, ax = plt.subplots(figsize=(15, 12))
@@ -229,21 +187,22 @@ def create_polygon_heatmap(geojson_data, output_file='kharkiv_polygon_heatmap.pn
     print(f"Polygon heatmap saved as {output_file}")
     return fig
 
-def generate_risk_statistics(risk_data):
+def generate_risk_statistics(points):
     """Generate comprehensive risk statistics."""
-    risks = [item['risk'] for item in risk_data]
+    summary = summarize(points.risk, band_edges=RISK_BAND_EDGES, quantiles=(0.5,))
+    low, medium, high = summary['bands']
     
     stats = {
-        'total_areas': len(risks),
-        'min_risk': min(risks),
-        'max_risk': max(risks),
-        'mean_risk': np.mean(risks),
-        'median_risk': np.median(risks),
-        'std_risk': np.std(risks),
-        'high_risk_areas': sum(1 for r in risks if r > 0.7),
-        'medium_risk_areas': sum(1 for r in risks if 0.3 < r <= 0.7),
-        'low_risk_areas': sum(1 for r in risks if r <= 0.3),
-        'zero_risk_areas': sum(1 for r in risks if r == 0)
+        'total_areas': summary['count'],
+        'min_risk': summary['min'],
+        'max_risk': summary['max'],
+        'mean_risk': summary['mean'],
+        'median_risk': summary['quantiles'][0.5],
+        'std_risk': summary['std'],
+        'high_risk_areas': high,
+        'medium_risk_areas': medium,
+        'low_risk_areas': low,
+        'zero_risk_areas': summary['zero']
     }
     
     print("\n" + "="*50)
@@ -270,27 +229,26 @@ def main():
     
     try:
         # Load data
-        geojson_data = load_geojson_data(input_file)
-        risk_data = extract_risk_data(geojson_data)
+        points = load_risk_points(input_file)
         
         # Generate statistics
-        stats = generate_risk_statistics(risk_data)
+        stats = generate_risk_statistics(points)
         
         # Create different types of heatmaps
         print(f"\nGenerating heatmap visualizations...")
         
         # 1. Static scatter heatmap
-        create_static_heatmap(risk_data)
+        create_static_heatmap(points)
         
         # 2. Interpolated heatmap
-        create_interpolated_heatmap(risk_data)
+        create_interpolated_heatmap(points)
         
         # 3. Interactive heatmap
-        create_interactive_heatmap(risk_data)
+        create_interactive_heatmap(points)
         
         # 4. Polygon-based heatmap (if geopandas is available)
         try:
-            create_polygon_heatmap(geojson_data)
+            create_polygon_heatmap(input_file)
         except Exception as e:
             print(f"Could not create polygon heatmap: {e}")
         
@@ -6,86 +6,53 @@ This script creates a basic heatmap using only standard Python libraries.
 Requires: matplotlib, numpy, json (all usually available by default)
 """
 
-import json
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 from matplotlib.patches import Rectangle
 import sys
 
-def load_geojson_data(filepath):
-    """Load and parse the GeoJSON file."""
+from geojson_stream import read_risk_points
+from risk_raster import draw_raster, rasterize
+from risk_stats import count_unique_points, summarize
+
+# Zero, very low, low, medium, high and very high risk bands for the analysis
+RISK_BAND_EDGES = (0.0, 0.2, 0.4, 0.6, 0.8)
+
+def load_risk_points(filepath):
+    """Stream the GeoJSON file into centroid and risk arrays (RiskPoints)."""
     print(f"Loading data from {filepath}...")
     try:
-        with open(filepath, 'r') as f:
-            data = json.load(f)
-        print(f"✅ Loaded {len(data['features'])} features")
-        return data
+        points = read_risk_points(
+            filepath, on_progress=lambda n: print(f"  Processed {n:,} features"))
     except FileNotFoundError:
         print(f"❌ Error: File '{filepath}' not found!")
         return None
     except Exception as e:
         print(f"❌ Error loading file: {e}")
         return None
+    print(f"✅ Extracted {len(points.risk):,} valid risk data points")
+    return points
 
-def extract_risk_data(geojson_data):
-    """Extract risk values and coordinates from GeoJSON features."""
-    if not geojson_data:
-        return []
-    
-    risk_data = []
-    print("Extracting risk data from polygons...")
-    
-    for i, feature in enumerate(geojson_data['features']):
-        if i % 10000 == 0:  # Progress indicator
-            print(f"  Processing feature {i+1:,}/{len(geojson_data['features']):,}")
-        
-        risk = feature['properties'].get('risk', 0)
-        geometry = feature['geometry']
-        
-        if geometry['type'] == 'Polygon' and geometry['coordinates']:
-            # Get the centroid of the polygon
-            coords = geometry['coordinates'][0]  # First ring (outer boundary)
-            if len(coords) > 0:
-                lons = [coord[0] for coord in coords if len(coord) >= 2]
-                lats = [coord[1] for coord in coords if len(coord) >= 2]
-                
-                if lons and lats:  # Make sure we have valid coordinates
-                    # Calculate centroid
-                    centroid_lon = sum(lons) / len(lons)
-                    centroid_lat = sum(lats) / len(lats)
-                    
-                    risk_data.append({
-                        'lat': centroid_lat,
-                        'lon': centroid_lon,
-                        'risk': risk
-                    })
-    
-    print(f"✅ Extracted {len(risk_data)} valid risk data points")
-    return risk_data
-
-def create_scatter_heatmap(risk_data, output_file='kharkiv_simple_heatmap.png'):
-    """Create a simple scatter plot heatmap."""
-    if not risk_data:
+def create_scatter_heatmap(points, output_file='kharkiv_simple_heatmap.png', agg='mean'):
+    """Create a simple heatmap: the cells binned into one raster, ``agg`` risk per pixel."""
+    if points is None or len(points.risk) == 0:
         print("❌ No data to plot!")
         return None
     
     print("Creating scatter heatmap...")
     
-    # Extract data for plotting
-    lats = [item['lat'] for item in risk_data]
-    lons = [item['lon'] for item in risk_data]
-    risks = [item['risk'] for item in risk_data]
+    lons, lats, risks = points
     
     # Create figure with proper size
     plt.figure(figsize=(16, 12))
     
-    # Create scatter plot with color mapping
-    scatter = plt.scatter(lons, lats, c=risks, cmap='YlOrRd', 
-                         s=0.5, alpha=0.7, edgecolors='none')
+    # Bin the cells into one image instead of drawing a marker per cell
+    image, extent = rasterize(lons, lats, risks, agg=agg, max_shape=(12 * 300, 16 * 300))
+    raster = draw_raster(plt.gca(), image, extent, cmap='YlOrRd', vmin=risks.min(), vmax=risks.max(), alpha=0.7)
     
     # Add colorbar
-    cbar = plt.colorbar(scatter, shrink=0.8, pad=0.02)
+    cbar = plt.colorbar(raster, ax=plt.gca(), shrink=0.8, pad=0.02)
     cbar.set_label('Mine Risk Level', fontsize=14, fontweight='bold')
     cbar.ax.tick_params(labelsize=12)
     
@@ -103,8 +70,8 @@ def create_scatter_heatmap(risk_data, output_file='kharkiv_simple_heatmap.png'):
     # Add statistics text box
     stats_text = (f'Risk Statistics:\n'
                  f'Total Areas: {len(risks):,}\n'
-                 f'Min Risk: {min(risks):.3f}\n'
-                 f'Max Risk: {max(risks):.3f}\n'
+                 f'Min Risk: {risks.min():.3f}\n'
+                 f'Max Risk: {risks.max():.3f}\n'
                  f'Mean Risk: {np.mean(risks):.3f}\n'
                  f'Std Dev: {np.std(risks):.3f}')
     
@@ -115,8 +82,8 @@ def create_scatter_heatmap(risk_data, output_file='kharkiv_simple_heatmap.png'):
     # Improve layout
     plt.tight_layout()
     
-    # Save with high DPI
-    plt.savefig(output_file, dpi=300, bbox_inches='tight', facecolor='white')
+    # Save with high DPI (on the figure: pyplot's savefig redraws it afterwards)
+    plt.gcf().savefig(output_file, dpi=300, bbox_inches='tight', facecolor='white')
     print(f"✅ Heatmap saved as {output_file}")
     
     # Also show the plot
@@ -124,18 +91,15 @@ def create_scatter_heatmap(risk_data, output_file='kharkiv_simple_heatmap.png'):
     
     return plt.gcf()
 
-def create_grid_heatmap(risk_data, output_file='kharkiv_grid_heatmap.png', grid_size=100):
+def create_grid_heatmap(points, output_file='kharkiv_grid_heatmap.png', grid_size=100):
     """Create a grid-based heatmap by binning the data."""
-    if not risk_data:
+    if points is None or len(points.risk) == 0:
         print("❌ No data to plot!")
         return None
     
     print("Creating grid-based heatmap...")
     
-    # Extract coordinates and risks
-    lats = np.array([item['lat'] for item in risk_data])
-    lons = np.array([item['lon'] for item in risk_data])
-    risks = np.array([item['risk'] for item in risk_data])
+    lons, lats, risks = points
     
     # Define grid boundaries
     lat_min, lat_max = lats.min(), lats.max()
@@ -200,33 +164,29 @@ def create_grid_heatmap(risk_data, output_file='kharkiv_grid_heatmap.png', grid_
     plt.show()
     return plt.gcf()
 
-def generate_risk_analysis(risk_data):
+def generate_risk_analysis(points):
     """Generate detailed risk analysis and statistics."""
-    if not risk_data:
+    if points is None or len(points.risk) == 0:
         print("❌ No data for analysis!")
         return {}
     
-    risks = [item['risk'] for item in risk_data]
-    
     # Calculate statistics
+    summary = summarize(points.risk, band_edges=RISK_BAND_EDGES, quantiles=(0.25, 0.5, 0.75))
     stats = {
-        'total_areas': len(risks),
-        'min_risk': min(risks),
-        'max_risk': max(risks),
-        'mean_risk': np.mean(risks),
-        'median_risk': np.median(risks),
-        'std_risk': np.std(risks),
-        'q25_risk': np.percentile(risks, 25),
-        'q75_risk': np.percentile(risks, 75),
+        'total_areas': summary['count'],
+        'min_risk': summary['min'],
+        'max_risk': summary['max'],
+        'mean_risk': summary['mean'],
+        'median_risk': summary['quantiles'][0.5],
+        'std_risk': summary['std'],
+        'q25_risk': summary['quantiles'][0.25],
+        'q75_risk': summary['quantiles'][0.75],
     }
     
-    # Risk level categorization
-    stats['zero_risk'] = sum(1 for r in risks if r == 0.0)
-    stats['very_low_risk'] = sum(1 for r in risks if 0.0 < r <= 0.2)
-    stats['low_risk'] = sum(1 for r in risks if 0.2 < r <= 0.4)
-    stats['medium_risk'] = sum(1 for r in risks if 0.4 < r <= 0.6)
-    stats['high_risk'] = sum(1 for r in risks if 0.6 < r <= 0.8)
-    stats['very_high_risk'] = sum(1 for r in risks if r > 0.8)
+    # Risk level categorization; the band up to 0.0 holds no negative risks, so only zeros
+    stats['zero_risk'] = summary['zero']
+    (_, stats['very_low_risk'], stats['low_risk'], stats['medium_risk'],
+     stats['high_risk'], stats['very_high_risk']) = summary['bands']
     
     # Print comprehensive analysis
     print("\n" + "="*60)
@@ -234,7 +194,7 @@ def generate_risk_analysis(risk_data):
     print("="*60)
     print(f"📊 Dataset Overview:")
     print(f"   Total Areas Analyzed: {stats['total_areas']:,}")
-    print(f"   Geographic Coverage: {len(set((d['lat'], d['lon']) for d in risk_data)):,} unique locations")
+    print(f"   Geographic Coverage: {count_unique_points(points.lat, points.lon):,} unique locations")
     
     print(f"\n📈 Risk Statistics:")
     print(f"   Range: {stats['min_risk']:.4f} - {stats['max_risk']:.4f}")
@@ -263,14 +223,14 @@ def generate_risk_analysis(risk_data):
     
     return stats
 
-def create_risk_distribution_plot(risk_data, output_file='kharkiv_risk_distribution.png'):
+def create_risk_distribution_plot(points, output_file='kharkiv_risk_distribution.png'):
     """Create a histogram showing risk distribution."""
-    if not risk_data:
+    if points is None or len(points.risk) == 0:
         return None
     
     print("Creating risk distribution plot...")
     
-    risks = [item['risk'] for item in risk_data]
+    risks = points.risk
     
     plt.figure(figsize=(12, 8))
     
@@ -316,32 +276,29 @@ def main():
     print("="*50)
     
     # Load data
-    geojson_data = load_geojson_data(input_file)
-    if not geojson_data:
+    points = load_risk_points(input_file)
+    if points is None:
         print("❌ Cannot proceed without data file!")
         return
-    
-    # Extract risk data
-    risk_data = extract_risk_data(geojson_data)
-    if not risk_data:
+    if len(points.risk) == 0:
         print("❌ No valid risk data found!")
         return
     
     # Generate analysis
-    stats = generate_risk_analysis(risk_data)
+    stats = generate_risk_analysis(points)
     
     # Create visualizations
     print(f"\n🎨 Generating visualizations...")
     
     try:
         # 1. Scatter heatmap
-        create_scatter_heatmap(risk_data)
+        create_scatter_heatmap(points)
         
         # 2. Grid heatmap  
-        create_grid_heatmap(risk_data)
+        create_grid_heatmap(points)
         
         # 3. Risk distribution
-        create_risk_distribution_plot(risk_data)
+        create_risk_distribution_plot(points)
         
         print(f"\n✅ All visualizations completed successfully!")
         print(f"📁 Generated files:")
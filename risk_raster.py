@@ -0,0 +1,125 @@
+"""
+Rasterized rendering of per-cell risk.
+
+The grid cells sit on a regular lattice, so instead of drawing one scatter
+marker per cell the heatmap scripts bin risk straight into a 2D array and
+draw it at once. By default the raster has one pixel per lattice cell;
+``max_shape`` caps it at the output resolution, in which case every pixel
+aggregates the cells falling into it. Needs only NumPy and matplotlib.
+"""
+import matplotlib as mpl
+import numpy as np
+from matplotlib import colormaps
+from matplotlib.cm import ScalarMappable
+from matplotlib.colors import Normalize, to_rgba
+
+AGGREGATIONS = ("mean", "max")
+
+# Rasters up to this many pixels are drawn as a mesh of filled squares, which
+# Agg fills directly; larger ones go through imshow, whose cost is set by the
+# output resolution rather than the raster size
+MESH_MAX_PIXELS = 1 << 19
+
+
+def lattice_step(values) -> float:
+    """
+    Spacing of a lattice coordinate: the most common gap between distinct
+    values. Gaps below a billionth of the span (floating-point noise) are
+    ignored, and so are the odd gaps next to off-lattice values such as
+    centroids of border-clipped cells.
+    """
+    values = np.unique(np.asarray(values, dtype=np.float64))
+    span = values[-1] - values[0] if len(values) else 0.0
+    if span == 0:
+        return 0.0
+    gaps = np.diff(values)
+    gaps = gaps[gaps > span * 1e-9]
+    rounded = np.round(gaps / span, 9)
+    keys, counts = np.unique(rounded, return_counts=True)
+    return float(np.median(gaps[rounded == keys[np.argmax(counts)]]))
+
+
+def rasterize(lon, lat, values, agg: str = "mean", max_shape=(4096, 4096)):
+    """
+    Bins ``values`` at (``lon``, ``lat``) into an image and returns
+    ``(image, extent)``: a (rows, columns) float64 array, row 0 at the
+    bottom and NaN where no point falls, and its ``(left, right, bottom,
+    top)`` extent for ``imshow(..., origin='lower')``. ``agg`` picks the
+    per-pixel ``mean`` or ``max``. There is one pixel per lattice step,
+    clamped to ``max_shape`` (rows, columns).
+    """
+    if agg not in AGGREGATIONS:
+        raise ValueError(f"agg must be one of {AGGREGATIONS}, got {agg!r}")
+    lon = np.asarray(lon, dtype=np.float64)
+    lat = np.asarray(lat, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) == 0:
+        return np.full((1, 1), np.nan), (0.0, 1.0, 0.0, 1.0)
+
+    axes = []
+    for coords, limit in ((lon, max_shape[1]), (lat, max_shape[0])):
+        lo, hi = coords.min(), coords.max()
+        step = lattice_step(coords)
+        n = int(round((hi - lo) / step)) + 1 if step > 0 else 1
+        if n > limit:
+            n = limit
+            step = (hi - lo) / (n - 1)
+        # Pixels are centred on the lattice nodes
+        idx = np.rint((coords - lo) / step).astype(np.int64) if step > 0 else np.zeros(len(coords), dtype=np.int64)
+        np.clip(idx, 0, n - 1, out=idx)
+        half = step / 2 if step > 0 else 0.5
+        axes.append((n, idx, lo - half, lo + (n - 1) * step + half))
+    (nx, ix, left, right), (ny, iy, bottom, top) = axes
+
+    flat = iy * nx + ix
+    if agg == "mean":
+        sums = np.bincount(flat, weights=values, minlength=nx * ny)
+        counts = np.bincount(flat, minlength=nx * ny)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            image = sums / counts
+    else:
+        image = np.full(nx * ny, -np.inf)
+        np.maximum.at(image, flat, values)
+        image[np.isneginf(image)] = np.nan
+    return image.reshape(ny, nx), (left, right, bottom, top)
+
+
+def draw_raster(ax, image, extent, cmap="YlOrRd", vmin=None, vmax=None, alpha=1.0, aspect=None) -> ScalarMappable:
+    """
+    Draws ``image`` (NaN pixels transparent) on ``ax`` and returns a mappable
+    for the colorbar. Colours are applied once at raster size. A raster of
+    up to ``MESH_MAX_PIXELS`` is filled as one square per pixel, so nothing
+    is resampled to the output resolution; a larger one is handed to imshow
+    as RGBA bytes.
+    """
+    norm = Normalize(np.nanmin(image) if vmin is None else vmin, np.nanmax(image) if vmax is None else vmax)
+    cmap = colormaps[cmap] if isinstance(cmap, str) else cmap
+    if image.size > MESH_MAX_PIXELS:
+        rgba = cmap(norm(image), alpha=alpha, bytes=True)
+        rgba[np.isnan(image)] = 0
+        ax.imshow(rgba, extent=extent, origin="lower", interpolation="nearest", aspect=aspect)
+        return ScalarMappable(norm=norm, cmap=cmap)
+
+    rgba = cmap(norm(image), alpha=alpha)
+    rgba[np.isnan(image)] = 0
+    left, right, bottom, top = extent
+    ny, nx = image.shape
+    # Stacked and laid out like an image: below later artists, same aspect
+    ax.pcolormesh(np.linspace(left, right, nx + 1), np.linspace(bottom, top, ny + 1), rgba,
+                  antialiased=False, zorder=0, rasterized=True)
+    ax.set_aspect(mpl.rcParams["image.aspect"] if aspect is None else aspect)
+    return ScalarMappable(norm=norm, cmap=cmap)
+
+
+def draw_points(ax, lon, lat, extent, shape, color="black", alpha=1.0, aspect=None):
+    """
+    Marks the points on ``ax`` as one (rows, columns) raster over ``extent``:
+    each point colours the pixel it falls in, however many points there are.
+    """
+    ny, nx = shape
+    left, right, bottom, top = extent
+    ix = np.clip(((np.asarray(lon) - left) * (nx / (right - left))).astype(np.int64), 0, nx - 1)
+    iy = np.clip(((np.asarray(lat) - bottom) * (ny / (top - bottom))).astype(np.int64), 0, ny - 1)
+    rgba = np.zeros((ny, nx, 4), dtype=np.uint8)
+    rgba[iy, ix] = np.round(np.multiply(to_rgba(color, alpha), 255)).astype(np.uint8)
+    ax.imshow(rgba, extent=extent, origin="lower", interpolation="nearest", aspect=aspect)
@@ -0,0 +1,154 @@
+"""
+Risk statistics shared by the heatmap scripts.
+
+``summarize`` computes the count, moments, quantiles, zero count and band
+counts of a risk array from a single sort: quantiles are read off the sorted
+values and band counts come from ``searchsorted`` against the band edges.
+``RiskHistogram`` gives the same summary for data seen chunk by chunk. Its
+moments, extremes and band counts are exact. Its quantiles come from a
+fixed-bin histogram and are accurate to one bin width. Two histograms built
+from different chunks can be merged.
+
+Bands are right-closed: with edges ``(e0, e1, ...)`` band 0 holds
+``r <= e0``, band k holds ``e(k-1) < r <= ek`` and the last band holds
+``r > e_last``.
+"""
+import numpy as np
+
+# Zero, very low, low, medium, high and very high risk
+DEFAULT_BAND_EDGES = (0.0, 0.2, 0.4, 0.6, 0.8)
+
+DEFAULT_QUANTILES = (0.25, 0.5, 0.75)
+
+
+def _summary(count, lo, hi, mean, std, quantiles, zero, bands, band_edges) -> dict:
+    return {
+        "count": int(count),
+        "min": float(lo),
+        "max": float(hi),
+        "mean": float(mean),
+        "std": float(std),
+        "quantiles": quantiles,
+        "zero": int(zero),
+        "bands": [int(b) for b in bands],
+        "band_edges": tuple(band_edges),
+    }
+
+
+def _empty_summary(quantiles, band_edges) -> dict:
+    nan = float("nan")
+    return _summary(0, nan, nan, nan, nan, {q: nan for q in quantiles}, 0,
+                    [0] * (len(band_edges) + 1), band_edges)
+
+
+def summarize(risks, band_edges=DEFAULT_BAND_EDGES, quantiles=DEFAULT_QUANTILES) -> dict:
+    """
+    Exact statistics of ``risks``: ``count``, ``min``, ``max``, ``mean``,
+    ``std`` (population), ``quantiles`` ({q: value}, NumPy's linear method),
+    ``zero`` (values equal to 0) and ``bands`` (counts per band).
+    """
+    values = np.sort(np.asarray(risks, dtype=np.float64))
+    n = len(values)
+    if n == 0:
+        return _empty_summary(quantiles, band_edges)
+
+    mean = values.mean()
+    std = np.sqrt(np.square(values - mean).mean())
+    qs = np.quantile(values, quantiles) if len(quantiles) else []
+    # Right-closed bands: the number of values <= each edge, then differences
+    at_or_below = np.searchsorted(values, band_edges, side="right")
+    bands = np.diff(np.concatenate(([0], at_or_below, [n])))
+    zero = np.searchsorted(values, 0.0, side="right") - np.searchsorted(values, 0.0, side="left")
+    return _summary(n, values[0], values[-1], mean, std, dict(zip(quantiles, qs)), zero, bands, band_edges)
+
+
+def count_unique_points(lat, lon) -> int:
+    """Number of distinct (lat, lon) pairs."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+    if len(lat) == 0:
+        return 0
+    order = np.lexsort((lon, lat))
+    lat, lon = lat[order], lon[order]
+    return 1 + int(np.count_nonzero((lat[1:] != lat[:-1]) | (lon[1:] != lon[:-1])))
+
+
+class RiskHistogram:
+    """
+    Mergeable running summary of risk values over ``bins`` equal bins on
+    ``value_range``. Values outside the range count in the end bins.
+    """
+
+    def __init__(self, band_edges=DEFAULT_BAND_EDGES, bins: int = 2048, value_range=(0.0, 1.0)):
+        self.band_edges = tuple(band_edges)
+        self.value_range = (float(value_range[0]), float(value_range[1]))
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.bands = np.zeros(len(self.band_edges) + 1, dtype=np.int64)
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared deviations from the mean
+        self.min = np.inf
+        self.max = -np.inf
+        self.zero = 0
+
+    def update(self, risks) -> "RiskHistogram":
+        """Adds a chunk of values; returns self."""
+        values = np.asarray(risks, dtype=np.float64).ravel()
+        if len(values) == 0:
+            return self
+        lo, hi = self.value_range
+        idx = ((values - lo) * (len(self.counts) / (hi - lo))).astype(np.int64)
+        np.clip(idx, 0, len(self.counts) - 1, out=idx)
+        self.counts += np.bincount(idx, minlength=len(self.counts))
+        self.bands += np.bincount(np.searchsorted(self.band_edges, values, side="left"), minlength=len(self.bands))
+        self.zero += int(np.count_nonzero(values == 0))
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+        mean = values.mean()
+        self._merge_moments(len(values), mean, np.square(values - mean).sum())
+        return self
+
+    def merge(self, other: "RiskHistogram") -> "RiskHistogram":
+        """Folds in a histogram built with the same bins and band edges; returns self."""
+        if (other.band_edges != self.band_edges or other.value_range != self.value_range
+                or len(other.counts) != len(self.counts)):
+            raise ValueError("Cannot merge histograms with different bins or band edges")
+        if other.count == 0:
+            return self
+        self.counts += other.counts
+        self.bands += other.bands
+        self.zero += other.zero
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._merge_moments(other.count, other.mean, other.m2)
+        return self
+
+    def _merge_moments(self, n, mean, m2):
+        # Chan et al.: combine counts, means and squared deviations of two parts
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile (linear method), within one bin width of the exact value."""
+        if self.count == 0:
+            return float("nan")
+        rank = q * (self.count - 1)
+        cumulative = np.cumsum(self.counts)
+        b = int(np.searchsorted(cumulative, rank, side="right"))
+        before = cumulative[b - 1] if b else 0
+        lo, hi = self.value_range
+        width = (hi - lo) / len(self.counts)
+        # Spread the bin's values evenly across it
+        value = lo + width * (b + (rank - before + 0.5) / self.counts[b])
+        return float(min(max(value, self.min), self.max))
+
+    def summary(self, quantiles=DEFAULT_QUANTILES) -> dict:
+        """The same dict as ``summarize``, with approximate quantiles."""
+        if self.count == 0:
+            return _empty_summary(quantiles, self.band_edges)
+        return _summary(self.count, self.min, self.max, self.mean, np.sqrt(self.m2 / self.count),
+                        {q: self.quantile(q) for q in quantiles}, self.zero, self.bands, self.band_edges)
@@ -27,6 +27,11 @@ export default function GovDownload() {
         ? `${base}/risk-map/geojson?partner=${partner}`
         : `${base}/risk-map/geojson`;
     }
+    if (type === "parquet" || type === "arrow") {
+      return partner
+        ? `${base}/risk-map/${type}?partner=${partner}`
+        : `${base}/risk-map/${type}`;
+    }
     return "#";
   };
 
@@ -112,7 +117,7 @@ export default function GovDownload() {
         <section className="bg-[#1f2a36] bg-opacity-90 p-6 rounded-2xl shadow-xl border border-teal-500/20">
           <h2 className="text-xl font-semibold mb-4 text-white">Export Options</h2>
           
-          <div className="grid grid-cols-1 md:grid-cols-3 gap-4 mb-6">
+          <div className="grid grid-cols-1 md:grid-cols-4 gap-4 mb-6">
             <button
               onClick={() => {
                 setFormat("png");
@@ -145,10 +150,21 @@ export default function GovDownload() {
             >
               {loading && format === "geojson" ? "Generating..." : "Download GeoJSON"}
             </button>
+
+            <button
+              onClick={() => {
+                setFormat("parquet");
+                fetchMap("parquet");
+              }}
+              disabled={loading}
+              className="bg-gradient-to-r from-teal-500 to-green-500 hover:from-teal-600 hover:to-green-600 disabled:from-gray-600 disabled:to-gray-700 text-white py-3 px-6 rounded-lg transition"
+            >
+              {loading && format === "parquet" ? "Generating..." : "Download GeoParquet"}
+            </button>
           </div>
 
           {/* Format Information */}
-          <div className="grid grid-cols-1 md:grid-cols-3 gap-4">
+          <div className="grid grid-cols-1 md:grid-cols-4 gap-4">
             <div className="bg-[#27323e] p-4 rounded-xl border border-teal-500/10">
               <h3 className="font-semibold text-white mb-2">PNG Image</h3>
               <p className="text-gray-300 text-sm">
@@ -172,6 +188,14 @@ export default function GovDownload() {
                 Includes all risk and partner information.
               </p>
             </div>
+
+            <div className="bg-[#27323e] p-4 rounded-xl border border-teal-500/10">
+              <h3 className="font-semibold text-white mb-2">GeoParquet Data</h3>
+              <p className="text-gray-300 text-sm">
+                Compact columnar format for analytics notebooks (pandas,
+                GeoPandas, DuckDB). Includes risk, partner and leader.
+              </p>
+            </div>
           </div>
         </section>
 
@@ -69,15 +69,27 @@ export default function NgoReports() {
 
   const generatePDFfromBackend = async () => {
     try {
-      const res = await fetch("http://localhost:8000/generate-pdf", {
+      // Queue the report, then poll its job until the PDF is ready
+      const job = await fetch("http://localhost:8000/reports", {
         method: "POST",
       });
-  
+      if (!job.ok) {
+        console.error("Failed to queue PDF:", job.statusText);
+        return;
+      }
+      const { url: jobUrl } = await job.json();
+
+      let res = await fetch(`http://localhost:8000${jobUrl}`);
+      while (res.status === 202) {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        res = await fetch(`http://localhost:8000${jobUrl}`);
+      }
+
       if (!res.ok) {
         console.error("Failed to fetch PDF:", res.statusText);
         return;
       }
-  
+
       const blob = await res.blob();
       const url = window.URL.createObjectURL(blob);
       const a = document.createElement("a");
@@ -196,24 +196,24 @@ export default function OpenStreetMap({
         console.log('Fetching Leader data...');
         setLoadingStatus(prev => ({ ...prev, leaders: true }));
         
-        const response = await fetch('http://localhost:8000/risk-map/geojson/leaders');
+        // One dissolved outline per leader instead of every cell
+        const response = await fetch('http://localhost:8000/risk-map/outlines?level=leader');
         if (!response.ok) {
           throw new Error(`HTTP error! status: ${response.status}`);
         }
         
         const data = await response.json();
-        console.log('Leader data received:', data);
+        console.log('Leader outlines received:', data);
         
-        // Use all leader data without skipping for efficiency
         // Only process leaders that are in the filtered list
         const fullLeaderData = {};
         filteredLeaders.forEach(leader => {
-          if (data[leader] && data[leader].features && data[leader].features.length > 0) {
+          const outline = data.features?.find(feature => feature.properties.leader === leader);
+          if (outline) {
             fullLeaderData[leader] = {
-              ...data[leader],
-              features: data[leader].features
+              type: 'FeatureCollection',
+              features: [outline]
             };
-            console.log(`Full features count for Leader ${leader}:`, fullLeaderData[leader].features.length);
           }
         });
         
@@ -403,19 +403,18 @@ export default function OpenStreetMap({
   };
 
   const onEachLeaderFeature = (leader) => (feature, layer) => {
-    const risk = feature.properties.risk || 0;
+    const risk = feature.properties.avg_risk || 0;
     const riskPercent = (risk * 100).toFixed(1);
-    const gridId = feature.properties.id || 'Unknown';
+    const numCells = feature.properties.num_cells || 0;
     const partner = feature.properties.partner || 'Unknown';
     
     layer.bindPopup(`
       <div>
         <h4>Leader ${leader} Region</h4>
-        <p><strong>Grid ID:</strong> ${gridId}</p>
-        <p><strong>Risk Level:</strong> ${riskPercent}%</p>
+        <p><strong>Grid Cells:</strong> ${numCells}</p>
+        <p><strong>Average Risk:</strong> ${riskPercent}%</p>
         <p><strong>Partner:</strong> ${partner}</p>
         <p><strong>Leader:</strong> ${leader}</p>
-        <p><em>All operational grid cells displayed</em></p>
       </div>
     `);
   };